@@ -0,0 +1,224 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'vms_http_requests_total': ('counter', 'Requests served, by URL name, method and status'),
+    'vms_http_request_duration_seconds': ('histogram', 'Request latency, by URL name and method'),
+    'vms_cache_requests_total': ('counter', 'Vendor cache lookups, by kind and hit/miss'),
+    'vms_function_duration_seconds': ('histogram', 'Time spent in instrumented functions'),
+}
+
+
+class MmapedDict:
+    """
+    Append-only float values keyed by string in a memory-mapped file. Layout:
+    an 8-byte header holding the bytes used, then entries of a uint32 key
+    length, the key padded to 8-byte alignment and a float64 value. Only the
+    owning process writes; readers parse a plain read() of the file.
+    """
+
+    def __init__(self, path, initial_size=1 << 16):
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(initial_size)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = struct.unpack_from('<I', self._map, 0)[0]
+        if not self._used:
+            self._used = 8
+            struct.pack_into('<I', self._map, 0, self._used)
+        self._positions = {key: position for key, _, position in self._entries(self._map, self._used)}
+
+    @staticmethod
+    def _entries(data, used):
+        position = 8
+        while position < used:
+            length = struct.unpack_from('<I', data, position)[0]
+            key = bytes(data[position + 4:position + 4 + length]).decode()
+            value_at = position + 4 + length + (-(4 + length) % 8)
+            yield key, struct.unpack_from('<d', data, value_at)[0], value_at
+            position = value_at + 8
+
+    @classmethod
+    def read_all(cls, path):
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        if len(data) < 8:
+            return []
+        return [(key, value) for key, value, _ in cls._entries(data, struct.unpack_from('<I', data, 0)[0])]
+
+    def _add_key(self, key):
+        encoded = key.encode()
+        entry = struct.pack(f'<I{len(encoded) + (-(4 + len(encoded)) % 8)}sd', len(encoded), encoded, 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        # Publish the entry only once it is fully written
+        struct.pack_into('<I', self._map, 0, self._used)
+        self._positions[key] = self._used - 8
+        return self._positions[key]
+
+    def inc(self, key, amount):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._add_key(key)
+        value = struct.unpack_from('<d', self._map, position)[0]
+        struct.pack_into('<d', self._map, position, value + amount)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def metrics_dir():
+    return str(getattr(settings, 'METRICS_DIR', settings.BASE_DIR / 'metrics'))
+
+
+class MetricsStore:
+    """
+    This process's samples, kept in METRICS_DIR/metrics_<pid>.db. The lock only
+    serialises this process's writer threads; scrapes read every process's
+    file without taking it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._owner = None
+
+    def _open(self):
+        owner = (os.getpid(), metrics_dir())
+        if self._owner != owner:
+            os.makedirs(owner[1], exist_ok=True)
+            self._values = MmapedDict(os.path.join(owner[1], f'metrics_{owner[0]}.db'))
+            self._owner = owner
+        return self._values
+
+    def inc(self, name, labels, amount=1.0):
+        key = json.dumps([name, sorted(labels.items())])
+        with self._lock:
+            self._open().inc(key, amount)
+
+    def observe(self, name, labels, seconds, buckets=DEFAULT_BUCKETS):
+        """ Histogram buckets are stored per bucket and summed into cumulative `le` counts on scrape """
+        index = bisect_left(buckets, seconds)
+        le = repr(buckets[index]) if index < len(buckets) else '+Inf'
+        self.inc(f'{name}_bucket', {**labels, 'le': le})
+        self.inc(f'{name}_sum', labels, seconds)
+        self.inc(f'{name}_count', labels)
+
+
+store = MetricsStore()
+
+
+def timed(function):
+    """ Record the wrapped callable's run time under vms_function_duration_seconds{function=...} """
+    def decorator(wrapped):
+        @wraps(wrapped)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return wrapped(*args, **kwargs)
+            finally:
+                store.observe('vms_function_duration_seconds', {'function': function},
+                              time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def collect():
+    """ Prometheus text exposition of the samples of every process writing to METRICS_DIR """
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(metrics_dir(), 'metrics_*.db')):
+        for key, value in MmapedDict.read_all(path):
+            totals[key] += value
+
+    families = defaultdict(list)
+    for key, value in totals.items():
+        name, pairs = json.loads(key)
+        family = next((metric for metric in METRICS if name == metric or name.startswith(metric + '_')), name)
+        families[family].append((name, [tuple(pair) for pair in pairs], value))
+
+    lines = []
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ('untyped', ''))
+        lines += [f'# HELP {family} {description}', f'# TYPE {family} {kind}']
+        samples = families[family]
+        if kind == 'histogram':
+            samples = _cumulative_buckets(family, samples)
+        lines += [f'{name}{_labels(pairs)} {value!r}' for name, pairs, value in sorted(samples)]
+
+    hits = defaultdict(lambda: {'hit': 0.0, 'miss': 0.0})
+    for name, pairs, value in families.get('vms_cache_requests_total', []):
+        labels = dict(pairs)
+        hits[labels['kind']][labels['result']] += value
+    if hits:
+        lines += ['# HELP vms_cache_hit_ratio Share of vendor cache lookups served from the cache',
+                  '# TYPE vms_cache_hit_ratio gauge']
+        for kind, counts in sorted(hits.items()):
+            lookups = counts['hit'] + counts['miss']
+            lines.append(f'vms_cache_hit_ratio{_labels([("kind", kind)])} {counts["hit"] / lookups if lookups else 0.0!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def _cumulative_buckets(family, samples):
+    buckets = defaultdict(dict)
+    others = []
+    for name, pairs, value in samples:
+        if name != f'{family}_bucket':
+            others.append((name, pairs, value))
+            continue
+        labels = [pair for pair in pairs if pair[0] != 'le']
+        buckets[tuple(labels)][dict(pairs)['le']] = value
+    for labels, counts in buckets.items():
+        running = 0.0
+        for bound in [repr(bound) for bound in DEFAULT_BUCKETS] + ['+Inf']:
+            running += counts.get(bound, 0.0)
+            others.append((f'{family}_bucket', sorted(list(labels) + [('le', bound)]), running))
+    return others
+
+
+class MetricsMiddleware:
+    """ Count and time every request under the URL name it resolved to """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        labels = {'view': match.url_name if match and match.url_name else 'unmatched', 'method': request.method}
+        store.observe('vms_http_request_duration_seconds', labels, time.perf_counter() - started)
+        store.inc('vms_http_requests_total', {**labels, 'status': str(response.status_code)})
+        return response
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1']):
+        return HttpResponseForbidden()
+    return HttpResponse(collect(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,130 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('vms.profiling')
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """ Time spent per section (db, serializer, signals) and queries run by one request """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self._depth = defaultdict(int)
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['db'] += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def profile_section(name):
+    """ Add the time spent in the block to the current request's `name` section; nested blocks count once """
+    profile = _current_profile.get()
+    if profile is None or profile._depth[name]:
+        yield
+        return
+    profile._depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.durations[name] += time.perf_counter() - started
+        profile._depth[name] -= 1
+
+
+def profiled(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(profile, total):
+    entries = [f'db;dur={1000 * profile.durations["db"]:.2f};desc="{profile.queries} queries"']
+    entries += [f'{name};dur={1000 * duration:.2f}' for name, duration in profile.durations.items() if name != 'db']
+    entries.append(f'total;dur={1000 * total:.2f}')
+    return ', '.join(entries)
+
+
+class ProfilingMiddleware:
+    """
+    Account each request's DB queries, serializer and signal time, report them
+    in a Server-Timing header and one JSON log line on `vms.profiling`, and dump
+    a cProfile of sampled requests (REQUEST_PROFILE_SAMPLE_RATE, or an
+    "X-Profile: 1" header when REQUEST_PROFILE_HEADER is on) to REQUEST_PROFILE_DIR.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_capture(self, request):
+        if getattr(settings, 'REQUEST_PROFILE_HEADER', False) and request.headers.get('X-Profile') == '1':
+            return True
+        rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        profiler = cProfile.Profile() if self.should_capture(request) else None
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            _current_profile.reset(token)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = server_timing(profile, total)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'url_name', None),
+            'status': response.status_code,
+            'total_ms': round(1000 * total, 2),
+            'db_queries': profile.queries,
+            'db_ms': round(1000 * profile.durations['db'], 2),
+            **{f'{name}_ms': round(1000 * duration, 2) for name, duration in profile.durations.items() if name != 'db'},
+        }
+        if profiler:
+            record['profile'] = self.dump(profiler, request)
+        logger.info(json.dumps(record))
+        return response
+
+    def dump(self, profiler, request):
+        directory = getattr(settings, 'REQUEST_PROFILE_DIR', settings.BASE_DIR / 'profiles')
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9.-]+', '_', request.path.strip('/')) or 'root'
+        path = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{time.time_ns() % 10 ** 9:09d}-{request.method}-{slug}.prof')
+        profiler.dump_stats(path)
+        return path
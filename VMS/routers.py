@@ -0,0 +1,54 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+def pin_to_primary():
+    _pinned_to_primary.set(True)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary and reads to one of settings.DATABASE_REPLICAS.
+    Once the current request has written, or while a transaction is open on
+    the primary, reads stay on the primary so the request sees its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or _pinned_to_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', []):
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """ Scope read-your-writes pinning to a single request """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _pinned_to_primary.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
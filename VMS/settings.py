@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -23,6 +24,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'VMS.metrics.MetricsMiddleware',
+    'VMS.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -30,6 +33,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'VMS.routers.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'VMS.urls'
@@ -59,6 +63,30 @@ DATABASES = {
     }
 }
 
+# High-concurrency SQLite profile: WAL, tuned pragmas, BEGIN IMMEDIATE and persistent connections.
+if os.environ.get('VMS_SQLITE_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'VMS.sqlite_wal',
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 20},
+    })
+
+# Read replica stand-in: a second SQLite file refreshed from the primary with `manage.py sync_replica`.
+DATABASE_REPLICAS = []
+if os.environ.get('VMS_READ_REPLICA'):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['VMS_READ_REPLICA'],
+                            'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS = ['replica']
+
+# Vendor sharding: VMS_SHARDS=N spreads vendors (and their POs and history) over the default
+# database plus N-1 more SQLite files, picked by a hash of vendor_code.
+VENDOR_SHARDS = ['default'] + [f'shard{index}' for index in range(1, int(os.environ.get('VMS_SHARDS', 1)))]
+for alias in VENDOR_SHARDS[1:]:
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': BASE_DIR / f'db.{alias}.sqlite3'}
+
+DATABASE_ROUTERS = ['Vendor.sharding.VendorShardRouter', 'VMS.routers.PrimaryReplicaRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -88,10 +116,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'Vendor.authentication.CachedJWTAuthentication',
     )
 }
 
+JWT_USER_CACHE_SIZE = 1024
+JWT_USER_CACHE_TTL = 60
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=14),
@@ -117,3 +148,59 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 }
+
+# "sync" keeps vendor metrics current inside the request that saves a PO,
+# "deferred" only queues the vendor for the process_vendor_metrics worker.
+VENDOR_METRICS_MODE = 'sync'
+VENDOR_METRICS_DEBOUNCE = 5
+
+# Days vendor performance history is kept at each resolution before `manage.py compact_performance_history`
+# rolls it into the next one (snapshots -> hourly -> daily -> monthly). Monthly rollups are kept forever
+# unless "month" is set.
+PERFORMANCE_HISTORY_RETENTION = {'raw': 7, 'hour': 30, 'day': 365, 'month': None}
+
+# Most points /api/vendors/<code>/performance/history returns; without ?bucket= the finest bucket within it is used.
+PERFORMANCE_HISTORY_MAX_POINTS = 500
+
+# Day counts /api/vendors/<code>/performance?window= accepts; windowed metrics are summed from VendorDailyStats.
+PERFORMANCE_WINDOWS = [30, 90, 365]
+
+# Relative accuracy of the response-time percentile sketches. Changing it re-buckets every response time,
+# so run `python manage.py rebuild_scorecards` afterwards.
+RESPONSE_TIME_SKETCH_ACCURACY = 0.01
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+# Use django.core.cache.backends.filebased.FileBasedCache to share entries between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vms',
+    }
+}
+VENDOR_CACHE_TIMEOUT = 300
+VENDOR_CACHE_LOCK_TIMEOUT = 10
+
+# Seconds between refreshes of the in-memory revoked-token set from the database.
+TOKEN_REVOCATION_SYNC_INTERVAL = 5
+
+# Allowed slowdown of `manage.py run_benchmarks` against benchmarks/baseline.json before it fails.
+BENCHMARK_REGRESSION_THRESHOLD = 0.5
+
+# Per-request profiling: every response carries a Server-Timing header and logs one JSON line on
+# "vms.profiling". A share of requests (or, when REQUEST_PROFILE_HEADER is on, those sending
+# "X-Profile: 1") are also run under cProfile and dumped to REQUEST_PROFILE_DIR.
+REQUEST_PROFILE_SAMPLE_RATE = 0.0
+REQUEST_PROFILE_HEADER = False
+REQUEST_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Prometheus metrics served at /metrics to METRICS_ALLOWED_IPS. Each worker process counts into its
+# own memory-mapped file in METRICS_DIR and a scrape sums them; clear the directory on deploy.
+METRICS_DIR = os.environ.get('VMS_METRICS_DIR', BASE_DIR / 'metrics')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Queries slower than SLOW_QUERY_THRESHOLD_MS (None turns this off) are logged on "vms.slowqueries" and
+# appended to SLOW_QUERY_LOG with their call site and EXPLAIN plan; `manage.py slow_queries` ranks them.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = BASE_DIR / 'slow_queries.log'
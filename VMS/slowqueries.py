@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import re
+import sysconfig
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+logger = logging.getLogger('vms.slowqueries')
+
+_explaining = ContextVar('explaining_slow_query', default=False)
+_write_lock = threading.Lock()
+_plans = {}
+# Installed packages and the standard library, which may sit under BASE_DIR in a project-local venv
+_LIBRARY_DIRS = tuple({os.path.join(path, '') for name, path in sysconfig.get_paths().items()
+                       if name in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+_PACKAGE_DIRS = (f'{os.sep}site-packages{os.sep}', f'{os.sep}dist-packages{os.sep}')
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def fingerprint(sql):
+    """ The statement with literals and placeholders replaced, so runs with different parameters group together """
+    for pattern, replacement in _LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _is_project_file(filename, root):
+    return filename.startswith(root) and filename != __file__ and not filename.startswith(_LIBRARY_DIRS) \
+        and not any(part in filename for part in _PACKAGE_DIRS)
+
+
+def call_site(limit=8):
+    """ The innermost project frames that issued the query, skipping Django, other libraries and this module """
+    root = str(settings.BASE_DIR) + os.sep
+    frames = [frame for frame in traceback.extract_stack()[:-2] if _is_project_file(frame.filename, root)]
+    return [f'{os.path.relpath(frame.filename, root)}:{frame.lineno} in {frame.name}' for frame in frames[-limit:]]
+
+
+def explain(connection, sql, params):
+    """
+    The database's plan for `sql`, once per fingerprint and process. It runs on
+    a bare backend cursor so query counters and wrappers don't see it.
+    """
+    key = (connection.alias, fingerprint(sql))
+    if key in _plans:
+        return _plans[key]
+    if connection.vendor == 'sqlite':
+        statement = f'EXPLAIN QUERY PLAN {sql}'
+    elif sql.lstrip()[:6].upper() == 'SELECT':
+        statement = f'EXPLAIN {sql}'
+    else:
+        return None
+    token = _explaining.set(True)
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(statement, params)
+        # SQLite rows are (id, parent, notused, detail); other backends return one text column
+        plan = [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as error:
+        plan = [f'EXPLAIN failed: {error}']
+    finally:
+        cursor.close()
+        _explaining.reset(token)
+    _plans[key] = plan
+    return plan
+
+
+def log_slow_query(record):
+    logger.warning(json.dumps(record))
+    path = getattr(settings, 'SLOW_QUERY_LOG', None)
+    if not path:
+        return
+    with _write_lock, open(path, 'a') as handle:
+        handle.write(json.dumps(record) + '\n')
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    if threshold is None or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = 1000 * (time.perf_counter() - started)
+    if elapsed_ms >= threshold:
+        connection = context['connection']
+        log_slow_query({
+            'time': time.time(),
+            'ms': round(elapsed_ms, 3),
+            'database': connection.alias,
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': [str(param) for param in params or []][:20] if not many else None,
+            'stack': call_site(),
+            'plan': None if many else explain(connection, sql, params),
+        })
+    return result
+
+
+@receiver(connection_created)
+def install_slow_query_log(sender, connection, **kwargs):
+    # Kept first in the list so execute_wrapper() blocks that pop the last wrapper leave it in place
+    if record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_slow_queries)
+
+
+def full_scans(plan):
+    """ Tables a SQLite plan reads without an index """
+    return sorted({match.group(1) for line in plan or [] for match in [re.match(r'SCAN (?:TABLE )?(\S+)$', line)] if match})
+
+
+def top_offenders(records, limit=10):
+    """ Slow-query log records grouped by fingerprint, by total time spent """
+    groups = defaultdict(list)
+    for record in records:
+        groups[record['fingerprint']].append(record)
+    summary = []
+    for key, runs in groups.items():
+        times = [run['ms'] for run in runs]
+        sites = Counter(run['stack'][-1] for run in runs if run['stack'])
+        plan = next((run['plan'] for run in reversed(runs) if run['plan']), None)
+        summary.append({
+            'fingerprint': key,
+            'count': len(runs),
+            'total_ms': round(sum(times), 3),
+            'mean_ms': round(sum(times) / len(times), 3),
+            'max_ms': max(times),
+            'full_scans': full_scans(plan),
+            'call_sites': [site for site, _ in sites.most_common(3)],
+            'plan': plan,
+            'example': runs[-1]['sql'],
+        })
+    summary.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return summary[:limit]
+
+
+def read_log(path):
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
@@ -0,0 +1,35 @@
+from django.db.backends.sqlite3 import base
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite tuned for concurrent writers. Every connection switches to WAL and
+    applies DEFAULT_PRAGMAS (overridable with OPTIONS['pragmas']), and
+    transactions open with BEGIN IMMEDIATE so a writer takes the write lock up
+    front and waits on busy_timeout instead of failing with "database is
+    locked" when a deferred read transaction tries to upgrade.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
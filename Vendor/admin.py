@@ -13,4 +13,20 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
 
 @admin.register(HistorialPerformance)
 class HistorialPerformanceAdmin(admin.ModelAdmin):
-    list_display = ('vendor', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate', )
+    list_display = ('vendor', 'bucket', 'created_at', 'samples', 'on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate', )
+    list_filter = ('bucket', )
+    list_select_related = ('vendor', )
+
+@admin.register(VendorDailyStats)
+class VendorDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('vendor', 'date', 'total_orders', 'completed_orders', 'on_time_orders', 'quality_rating_count', 'response_time_count')
+    list_select_related = ('vendor', )
+
+@admin.register(ResponseTimeBucket)
+class ResponseTimeBucketAdmin(admin.ModelAdmin):
+    list_display = ('vendor', 'key', 'count')
+    list_select_related = ('vendor', )
+
+@admin.register(DirtyVendor)
+class DirtyVendorAdmin(admin.ModelAdmin):
+    list_display = ('vendor_id', 'marked_at')
@@ -5,4 +5,5 @@ class VendorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Vendor'
     def ready(self):
-        import Vendor.signals
\ No newline at end of file
+        import Vendor.signals
+        import VMS.slowqueries
@@ -0,0 +1,148 @@
+import statistics
+import time
+from datetime import datetime, timedelta
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+from .loadgen import generate
+from .models import Vendor, PurchaseOrder
+from .scorecard import apply_order_change, order_state, rebuild_scorecards
+from .sharding import on_vendor_shard, shard_for_vendor_code
+
+
+def _new_order(vendor):
+    return PurchaseOrder(vendor=vendor, created_by_id=vendor.created_by_id, items={'Pen': 6}, quantity=5,
+                         delivery_date=datetime.now() + timedelta(days=7))
+
+
+def _saved_order(vendor, acknowledged=False):
+    order = _new_order(vendor)
+    order.save()
+    if acknowledged:
+        order.acknowledgment_date = datetime.now()
+        order.save()
+    return order
+
+
+def save_create(vendor):
+    """ PurchaseOrder.save() of a new PO: number reservation, derived fields and the post_save recompute """
+    return _new_order(vendor).save
+
+
+def save_acknowledge(vendor):
+    order = _saved_order(vendor)
+    order.acknowledgment_date = datetime.now()
+    return order.save
+
+
+def save_complete(vendor):
+    order = _saved_order(vendor, acknowledged=True)
+    order.status, order.quality_rating = 'Completed', 8
+    return order.save
+
+
+def po_numbering(vendor):
+    return lambda: PurchaseOrder.assign_po_numbers(vendor, [PurchaseOrder()])
+
+
+def derived_fields(vendor):
+    """ The strptime round-trips in compute_derived_fields, without the database """
+    order = _new_order(vendor)
+    order.issue_date = datetime.now() - timedelta(hours=5)
+    order.acknowledgment_date = datetime.now()
+    order.status = 'Completed'
+    return order.compute_derived_fields
+
+
+def scorecard_delta(vendor):
+    """ The counter update post_save applies when a PO is completed """
+    order = _saved_order(vendor, acknowledged=True)
+    previous = order_state(order)
+    order.status, order.quality_rating = 'Completed', 8
+    current = order_state(order)
+    return lambda: apply_order_change(previous, current, vendor._state.db)
+
+
+def scorecard_rebuild(vendor):
+    """ Full recompute from the vendor's PO history, as the deferred worker does """
+    return lambda: rebuild_scorecards([vendor.pk], vendor._state.db)
+
+
+BENCHMARKS = {
+    'save_create': save_create,
+    'save_acknowledge': save_acknowledge,
+    'save_complete': save_complete,
+    'po_numbering': po_numbering,
+    'derived_fields': derived_fields,
+    'scorecard_delta': scorecard_delta,
+    'scorecard_rebuild': scorecard_rebuild,
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def measure(benchmark, vendor, repeat, warmup=3):
+    """
+    Wall time of `repeat` runs (each after its own untimed setup) and the
+    queries of one run. Queries are counted after the warmup, so one-off work
+    such as creating today's stats rows doesn't make the count depend on the
+    time of day.
+    """
+    for _ in range(warmup):
+        benchmark(vendor)()
+    run = benchmark(vendor)
+    with CaptureQueriesContext(connections[vendor._state.db]) as queries:
+        run()
+    timings = []
+    for _ in range(repeat):
+        run = benchmark(vendor)
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return {
+        'median_ms': round(1000 * statistics.median(timings), 4),
+        'min_ms': round(1000 * min(timings), 4),
+        'queries': len(queries),
+    }
+
+
+def run_benchmarks(sizes, names=None, repeat=20):
+    """
+    Time each benchmark against a vendor with `size` POs of history, for every
+    size. The history is generated inside a transaction that is rolled back.
+    """
+    results = {}
+    for size in sizes:
+        prefix = f'BENCH{size}X'
+        using = shard_for_vendor_code(f'{prefix}{0:07d}')
+        try:
+            with transaction.atomic(using=using):
+                generate(vendors=1, orders=size, prefix=prefix, seed=size)
+                vendor = on_vendor_shard(Vendor.objects.all(), f'{prefix}{0:07d}').get(vendor_code=f'{prefix}{0:07d}')
+                results[str(size)] = {name: measure(BENCHMARKS[name], vendor, repeat) for name in names or BENCHMARKS}
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
+
+
+def regressions(results, baseline, threshold, min_delta_ms=0.1):
+    """
+    Benchmarks slower than the baseline by more than `threshold` (a fraction)
+    and `min_delta_ms`, or running more queries. Times are compared on the
+    fastest run, which is far less noisy than the median. Missing baseline
+    entries are skipped.
+    """
+    found = []
+    for size, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            expected = baseline.get(size, {}).get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                found.append(f'{name} @ {size} POs: {result["queries"]} queries, baseline {expected["queries"]}')
+            limit = expected['min_ms'] * (1 + threshold)
+            if result['min_ms'] > limit and result['min_ms'] - expected['min_ms'] > min_delta_ms:
+                found.append(f'{name} @ {size} POs: {result["min_ms"]} ms, baseline {expected["min_ms"]} ms')
+    return found
@@ -0,0 +1,76 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from VMS.metrics import store
+
+
+VENDOR_CACHE_KINDS = ['detail', 'performance', 'validators']
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _count(name, key):
+    with _stats_lock:
+        _stats[name] += 1
+    store.inc('vms_cache_requests_total', {'kind': key.rsplit(':', 1)[-1], 'result': 'hit' if name == 'hits' else 'miss'})
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else None
+    return stats
+
+
+def vendor_key(vendor_code, kind):
+    return f'vendor:{vendor_code}:{kind}'
+
+
+def get_or_build(key, build):
+    """
+    Return the cached value for `key`, building it on a miss. Only the caller
+    that wins the lock rebuilds; the others poll briefly for its result before
+    falling back to building it themselves.
+    """
+    value = cache.get(key)
+    if value is not None:
+        _count('hits', key)
+        return value
+
+    _count('misses', key)
+    lock_key = f'{key}:lock'
+    lock_timeout = getattr(settings, 'VENDOR_CACHE_LOCK_TIMEOUT', 10)
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if cache.get(lock_key) is None:
+                break
+        return build()
+
+    try:
+        value = build()
+        cache.set(key, value, timeout=getattr(settings, 'VENDOR_CACHE_TIMEOUT', 300))
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_vendor(*vendor_codes):
+    """
+    Drop the cached entries of the given vendors now and again once the
+    surrounding transaction commits, so a read racing the write cannot
+    re-cache uncommitted state.
+    """
+    keys = [vendor_key(code, kind) for code in set(vendor_codes) if code for kind in VENDOR_CACHE_KINDS]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,47 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from .sharding import scatter
+
+
+def make_validators(*parts, last_modified=None):
+    """ Weak ETag over `parts` plus the Last-Modified timestamp, as used by conditional GETs """
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"', int(last_modified.timestamp()) if last_modified else None
+
+
+def row_validators(queryset):
+    """ Validators of the single row matched by `queryset`; raises DoesNotExist like get() """
+    pk, updated_at = queryset.values_list('pk', 'updated_at').get()
+    return make_validators(pk, updated_at.isoformat(), last_modified=updated_at)
+
+
+def list_validators(queryset, query_params=None):
+    """
+    Validators of a whole (filtered) list from one max(updated_at) + count query per shard.
+    The sorted query string goes into the ETag, so each page (cursor, page_size) gets its own.
+    """
+    summaries = [part.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+                 for part in scatter(queryset)]
+    last_modified = max((summary['last_modified'] for summary in summaries if summary['last_modified']),
+                        default=None)
+    count = sum(summary['count'] for summary in summaries)
+    query = urlencode(sorted(query_params.lists()), doseq=True) if query_params else ''
+    return make_validators(count, last_modified.isoformat() if last_modified else None, query,
+                           last_modified=last_modified)
+
+
+def add_validators(response, validators):
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def not_modified(request, validators):
+    """ The 304 response to send when the client's copy is still current, otherwise None """
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return add_validators(response, validators) if response is not None else None
@@ -0,0 +1,59 @@
+import csv
+import heapq
+import json
+from datetime import date
+from operator import itemgetter
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from .models import PurchaseOrder
+from .sharding import scatter
+
+
+EXPORT_FIELDS = ['po_number', 'vendor_code', 'order_date', 'delivery_date', 'items', 'quantity', 'status',
+                 'quality_rating', 'issue_date', 'acknowledgment_date', 'response_time', 'on_time_delivery']
+EXPORT_FORMATS = ['ndjson', 'csv']
+
+
+class Echo:
+    """ File-like object whose write() hands the line back instead of buffering it """
+    def write(self, value):
+        return value
+
+
+def export_rows(chunk_size=2000):
+    """ Every PO in (order_date, po_number) order, streamed from each shard and merged """
+    queryset = (PurchaseOrder.objects.order_by('order_date', 'po_number')
+                .annotate(vendor_code=F('vendor__vendor_code'))
+                .values(*EXPORT_FIELDS))
+    return heapq.merge(*[part.iterator(chunk_size=chunk_size) for part in scatter(queryset)],
+                       key=itemgetter('order_date', 'po_number'))
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[field]) for field in EXPORT_FIELDS])
+
+
+def export_purchase_orders(output_format, chunk_size=2000):
+    """ Lazily render every PO as NDJSON or CSV lines, holding at most one chunk of rows in memory """
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format, use one of {", ".join(EXPORT_FORMATS)}')
+    rows = export_rows(chunk_size)
+    return ndjson_lines(rows) if output_format == 'ndjson' else csv_lines(rows)
@@ -0,0 +1,56 @@
+from datetime import datetime, time, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import order_status
+
+
+def parse_boundary(name, value, end=False):
+    """
+    Parse a datetime or a plain date query parameter. A plain date used as an
+    upper bound covers the whole day.
+    """
+    try:
+        day = parse_date(value)
+        parsed = None if day else parse_datetime(value)
+    except ValueError:
+        day = parsed = None
+    if parsed:
+        return parsed, False
+    if day is None:
+        raise ValueError(f'{name} should be a date or datetime')
+    if end:
+        return datetime.combine(day + timedelta(days=1), time.min), True
+    return datetime.combine(day, time.min), False
+
+
+def filter_date_range(queryset, params, field):
+    lookups = {}
+    if params.get(f'{field}_from'):
+        start, _ = parse_boundary(f'{field}_from', params[f'{field}_from'])
+        lookups[f'{field}__gte'] = start
+    if params.get(f'{field}_to'):
+        end, exclusive = parse_boundary(f'{field}_to', params[f'{field}_to'], end=True)
+        lookups[f'{field}__lt' if exclusive else f'{field}__lte'] = end
+    return queryset.filter(**lookups)
+
+
+def filter_purchase_orders(queryset, params):
+    """
+    Narrow purchase orders by vendor_code, status, acknowledged and the
+    order_date/delivery_date ranges (<field>_from / <field>_to).
+    """
+    if params.get('vendor_code'):
+        queryset = queryset.filter(vendor__vendor_code=params['vendor_code'])
+
+    if params.get('status'):
+        if params['status'] not in [choice[0] for choice in order_status]:
+            raise ValueError('Invalid status')
+        queryset = queryset.filter(status=params['status'])
+
+    acknowledged = params.get('acknowledged')
+    if acknowledged:
+        if acknowledged.lower() not in ('true', 'false'):
+            raise ValueError('acknowledged should be true or false')
+        queryset = queryset.filter(acknowledgment_date__isnull=acknowledged.lower() == 'false')
+
+    queryset = filter_date_range(queryset, params, 'order_date')
+    return filter_date_range(queryset, params, 'delivery_date')
@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Min, Sum, When
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from .models import HistorialPerformance
+from .scorecard import METRIC_FIELDS
+from .sharding import vendor_shards
+
+
+# Each level is rolled up into the next one once it is older than its retention
+ROLLUP_LEVELS = ['raw', 'hour', 'day', 'month']
+DEFAULT_RETENTION = {'raw': 7, 'hour': 30, 'day': 365, 'month': None}
+# Chart bucket sizes, finest first, with their (longest) width for counting points
+HISTORY_BUCKETS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1),
+                   'month': timedelta(days=31)}
+
+
+def bucket_start(moment, bucket):
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if bucket in ('day', 'month'):
+        moment = moment.replace(hour=0)
+    if bucket == 'month':
+        moment = moment.replace(day=1)
+    return moment
+
+
+def history_retention():
+    """ Days each level is kept before compaction, from PERFORMANCE_HISTORY_RETENTION """
+    retention = {**DEFAULT_RETENTION, **getattr(settings, 'PERFORMANCE_HISTORY_RETENTION', {})}
+    kept = [retention[level] for level in ROLLUP_LEVELS[:-1]]
+    if None in kept or kept != sorted(kept):
+        raise ValueError('PERFORMANCE_HISTORY_RETENTION must keep each finer level for fewer days than the next')
+    return retention
+
+
+class _Rollup:
+    """ min/max/last and sum/count of each metric over the rows of one vendor and period, fed in created_at order """
+
+    def __init__(self, vendor_id, start, bucket):
+        self.row = HistorialPerformance(vendor_id=vendor_id, bucket=bucket, created_at=start, samples=0)
+
+    def add(self, row):
+        self.row.created_by_id = row['created_by_id']
+        self.row.samples += row['samples']
+        for field in METRIC_FIELDS:
+            value = row[field]
+            low = row[f'{field}_min'] if row[f'{field}_min'] is not None else value
+            high = row[f'{field}_max'] if row[f'{field}_max'] is not None else value
+            setattr(self.row, field, value)
+            if low is not None:
+                current = getattr(self.row, f'{field}_min')
+                setattr(self.row, f'{field}_min', low if current is None else min(current, low))
+            if high is not None:
+                current = getattr(self.row, f'{field}_max')
+                setattr(self.row, f'{field}_max', high if current is None else max(current, high))
+            total = row[f'{field}_sum'] if row[f'{field}_sum'] is not None else value
+            if total is not None:
+                count = row[f'{field}_count'] if row[f'{field}_count'] is not None else 1
+                setattr(self.row, f'{field}_sum', (getattr(self.row, f'{field}_sum') or 0) + total)
+                setattr(self.row, f'{field}_count', (getattr(self.row, f'{field}_count') or 0) + count)
+
+
+def compact_level(level, cutoff, using=None, vendor_batch=500, batch_size=2000):
+    """
+    Replace the `level` rows created before `cutoff` with one rollup per vendor
+    and period of the next level. `cutoff` must fall on a boundary of that
+    period so no period is split between a rollup and later rows.
+    """
+    target = ROLLUP_LEVELS[ROLLUP_LEVELS.index(level) + 1]
+    rows = HistorialPerformance.objects.db_manager(using).filter(bucket=level, created_at__lt=cutoff)
+    vendor_ids = list(rows.order_by('vendor_id').values_list('vendor_id', flat=True).distinct())
+    columns = ['vendor_id', 'created_by_id', 'created_at', 'samples'] + METRIC_FIELDS + \
+              [f'{field}_{side}' for field in METRIC_FIELDS for side in ('min', 'max', 'sum', 'count')]
+    compacted = created = 0
+    for start in range(0, len(vendor_ids), vendor_batch):
+        batch = rows.filter(vendor_id__in=vendor_ids[start:start + vendor_batch])
+        rollups, current = [], None
+        with transaction.atomic(using=using):
+            for row in batch.order_by('vendor_id', 'created_at', 'id').values(*columns).iterator(chunk_size=batch_size):
+                period = bucket_start(row['created_at'], target)
+                if current is None or (current.row.vendor_id, current.row.created_at) != (row['vendor_id'], period):
+                    current = _Rollup(row['vendor_id'], period, target)
+                    rollups.append(current.row)
+                current.add(row)
+                compacted += 1
+            periods = [rollup.created_at for rollup in rollups]
+            HistorialPerformance.objects.db_manager(using).bulk_create(rollups, batch_size=batch_size)
+            # created_at is auto_now_add, so each rollup is moved to its period after the insert
+            by_period = defaultdict(list)
+            for period, rollup in zip(periods, rollups):
+                by_period[period].append(rollup.pk)
+            for period, pks in by_period.items():
+                for offset in range(0, len(pks), batch_size):
+                    HistorialPerformance.objects.db_manager(using).filter(pk__in=pks[offset:offset + batch_size]) \
+                        .update(created_at=period)
+            batch.delete()
+        created += len(rollups)
+    return {'compacted': compacted, 'created': created}
+
+
+def compact_history(now=None, using=None):
+    """ Roll every level past its retention into the next one, finest first, and expire the oldest rollups """
+    now = now or timezone.now()
+    retention = history_retention()
+    results = {}
+    for level, target in zip(ROLLUP_LEVELS, ROLLUP_LEVELS[1:]):
+        cutoff = bucket_start(now - timedelta(days=retention[level]), target)
+        results[level] = compact_level(level, cutoff, using)
+    if retention['month'] is not None:
+        cutoff = bucket_start(now - timedelta(days=retention['month']), 'month')
+        results['expired'] = HistorialPerformance.objects.db_manager(using).filter(
+            bucket='month', created_at__lt=cutoff).delete()[0]
+    return results
+
+
+def compact_all_history(now=None):
+    return {using: compact_history(now, using) for using in vendor_shards()}
+
+
+def _rounded(value):
+    return None if value is None else value.quantize(Decimal('0.01'))
+
+
+def performance_history(rows, start, end, bucket=None):
+    """
+    Downsample history rows (already narrowed to one vendor and [start, end])
+    in the database to one point per `bucket`, with each metric's min, max and
+    mean over the snapshots, rollups counting for every snapshot they fold in.
+    Without a bucket the finest one giving at most PERFORMANCE_HISTORY_MAX_POINTS
+    points is used.
+    """
+    max_points = getattr(settings, 'PERFORMANCE_HISTORY_MAX_POINTS', 500)
+    if bucket is None:
+        bucket = next((name for name, width in HISTORY_BUCKETS.items() if (end - start) / width <= max_points), 'month')
+    elif bucket not in HISTORY_BUCKETS:
+        raise ValueError(f'bucket should be one of {", ".join(HISTORY_BUCKETS)}')
+    elif (end - start) / HISTORY_BUCKETS[bucket] > max_points:
+        raise ValueError(f'More than {max_points} {bucket} buckets requested, narrow the range or use a larger bucket')
+
+    aggregates = {}
+    for field in METRIC_FIELDS:
+        # Rollup rows carry their period's extremes, sum and count; snapshots only the value
+        aggregates[f'min_{field}'] = Min(Coalesce(f'{field}_min', field))
+        aggregates[f'max_{field}'] = Max(Coalesce(f'{field}_max', field))
+        aggregates[f'sum_{field}'] = Sum(Coalesce(f'{field}_sum', field))
+        aggregates[f'count_{field}'] = Sum(Coalesce(f'{field}_count', Case(
+            When(**{f'{field}__isnull': False}, then=1), default=0, output_field=IntegerField())))
+    points = rows.annotate(period=Trunc('created_at', bucket)).values('period') \
+                 .annotate(samples=Sum('samples'), **aggregates).order_by('period')
+    return bucket, [
+        {'period': point['period'], 'samples': point['samples'],
+         **{field: {'min': _rounded(point[f'min_{field}']), 'max': _rounded(point[f'max_{field}']),
+                    'avg': _rounded(point[f'sum_{field}'] / point[f'count_{field}']) if point[f'count_{field}'] else None}
+            for field in METRIC_FIELDS}}
+        for point in points
+    ]
+
+
+def performance_as_of(rows, moment):
+    """
+    The vendor's latest recorded metrics at `moment`, a single index probe on
+    (vendor, created_at). Compacted periods answer with the rollup's last value.
+    """
+    return rows.filter(created_at__lte=moment).order_by('-created_at', '-id') \
+               .values('created_at', 'bucket', *METRIC_FIELDS).first()
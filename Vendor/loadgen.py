@@ -0,0 +1,112 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from .models import Vendor, PurchaseOrder, PurchaseOrderSequence
+from .scorecard import rebuild_scorecards
+from .sharding import scatter, shard_for_vendor_code, using_shard
+
+
+STATUS_WEIGHTS = {'Completed': 70, 'Pending': 20, 'Cancelled': 10}
+PENDING_ACKNOWLEDGED_RATE = 0.5
+ON_TIME_RATE = 0.85
+MEAN_RESPONSE_HOURS = 24
+ITEMS = ['Pen', 'Paper', 'Stapler', 'Toner', 'Chair', 'Desk', 'Laptop', 'Cable']
+
+
+def order_counts(vendors, orders, rng):
+    """ Split `orders` over `vendors` with a long tail: a few vendors get most of the POs """
+    weights = [rng.paretovariate(1.2) for _ in range(vendors)]
+    total = sum(weights)
+    counts = [int(orders * weight / total) for weight in weights]
+    for index in range(orders - sum(counts)):
+        counts[index % vendors] += 1
+    return counts
+
+
+def build_order(vendor, rng, now, days):
+    order_date = now - timedelta(seconds=rng.uniform(0, days * 86400))
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+    order = PurchaseOrder(vendor=vendor, created_by_id=vendor.created_by_id, status=status,
+                          order_date=order_date, issue_date=order_date, created_at=order_date,
+                          delivery_date=order_date + timedelta(days=rng.randint(3, 30)),
+                          items={rng.choice(ITEMS): rng.randint(1, 50)}, quantity=rng.randint(1, 500),
+                          quality_rating=Decimal(0))
+    if status != 'Pending' or rng.random() < PENDING_ACKNOWLEDGED_RATE:
+        order.response_time = Decimal(f'{rng.expovariate(1 / MEAN_RESPONSE_HOURS):.2f}')
+        order.acknowledgment_date = order_date + timedelta(hours=float(order.response_time))
+    if status == 'Completed':
+        order.quality_rating = Decimal(rng.randint(40, 100)) / 10
+        order.on_time_delivery = rng.random() < ON_TIME_RATE
+    return order
+
+
+def _next_contact():
+    highest = [part.aggregate(highest=Max('contact_details'))['highest'] for part in scatter(Vendor.objects.all())]
+    return max([value for value in highest if value] + [1000000000]) + 1
+
+
+def generate(vendors, orders, prefix='LOAD', days=365, seed=0, batch_size=5000, vendor_chunk=500,
+             created_by=None, progress=None):
+    """
+    Insert `vendors` vendors and `orders` POs spread over the last `days` days
+    with bulk_create, then rebuild the vendors' scorecards from their POs.
+    POs are numbered like the API numbers them and the per-day sequences are
+    written afterwards, so later API-created POs continue the numbering.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    counts = {f'{prefix}{index:07d}': count for index, count in enumerate(order_counts(vendors, orders, rng))}
+    contact = _next_contact()
+    created = {'vendors': 0, 'orders': 0}
+
+    for start in range(0, vendors, vendor_chunk):
+        chunk = [Vendor(name=f'{prefix} Vendor {index:07d}', vendor_code=f'{prefix}{index:07d}',
+                        contact_details=contact + index, address=f'{index} Industrial Area',
+                        created_by=created_by)
+                 for index in range(start, min(start + vendor_chunk, vendors))]
+        by_shard = defaultdict(list)
+        for vendor in chunk:
+            by_shard[shard_for_vendor_code(vendor.vendor_code)].append(vendor)
+
+        for shard, shard_vendors in by_shard.items():
+            with transaction.atomic(using=shard):
+                using_shard(Vendor.objects.all(), shard).bulk_create(shard_vendors, batch_size=batch_size)
+                sequences, buffer = defaultdict(int), []
+                for vendor in shard_vendors:
+                    for _ in range(counts[vendor.vendor_code]):
+                        order = build_order(vendor, rng, now, days)
+                        day = order.order_date.date()
+                        sequences[vendor.vendor_code, day] += 1
+                        order.po_number = PurchaseOrder.format_po_number(vendor.vendor_code, day,
+                                                                         sequences[vendor.vendor_code, day])
+                        buffer.append(order)
+                        if len(buffer) >= batch_size:
+                            created['orders'] += _insert_orders(buffer, shard)
+                            buffer = []
+                created['orders'] += _insert_orders(buffer, shard)
+                # issue_date and created_at are auto_now_add too; build_order dates them at order_date
+                using_shard(PurchaseOrder.objects.filter(vendor__in=shard_vendors), shard) \
+                    .update(issue_date=F('order_date'), created_at=F('order_date'))
+                using_shard(PurchaseOrderSequence.objects.all(), shard).bulk_create(
+                    [PurchaseOrderSequence(vendor_code=code, date=day, last_number=number)
+                     for (code, day), number in sequences.items()], batch_size=batch_size)
+            rebuild_scorecards([vendor.pk for vendor in shard_vendors], shard)
+        created['vendors'] += len(chunk)
+        if progress:
+            progress(created)
+    return created
+
+
+def _insert_orders(orders, shard):
+    """ bulk_create `orders`, then put back the generated order_date that auto_now_add replaced with now() """
+    order_dates = [order.order_date for order in orders]
+    objects = using_shard(PurchaseOrder.objects.all(), shard)
+    objects.bulk_create(orders)
+    for order, order_date in zip(orders, order_dates):
+        order.order_date = order_date
+    objects.bulk_update(orders, ['order_date'], batch_size=500)
+    return len(orders)
@@ -0,0 +1,198 @@
+import itertools
+import math
+import queue
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Vendor, PurchaseOrder
+from .sharding import scatter
+
+
+_unique = itertools.count(random.SystemRandom().randint(10 ** 9, 3 * 10 ** 9))
+
+
+def percentile(sorted_values, fraction):
+    """ Nearest-rank percentile of an already sorted list """
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def sample_fixtures(size):
+    """ Up to `size` (vendor_code, name) pairs and PO numbers for the read scenarios to pick from """
+    vendors = [row for part in scatter(Vendor.objects.order_by('id').values_list('vendor_code', 'name'))
+               for row in part[:size]]
+    po_numbers = [po_number for part in scatter(PurchaseOrder.objects.order_by('-order_date')
+                                                .values_list('po_number', flat=True))
+                  for po_number in part[:size]]
+    return vendors, po_numbers
+
+
+class Session:
+    """ One worker's in-process API client, signed in as the load-test user """
+
+    def __init__(self, user, password, vendors, po_numbers, rng, host='localhost', page_size=100):
+        self.user = user
+        self.password = password
+        self.vendors = vendors
+        self.po_numbers = po_numbers
+        self.rng = rng
+        self.page_size = page_size
+        self.client = Client(HTTP_HOST=host, raise_request_exception=False,
+                             HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.own_vendor = self.new_vendor()
+
+    def call(self, method, path, data=None):
+        if method == 'get':
+            response = self.client.get(path, data)
+        else:
+            response = getattr(self.client, method)(path, data, content_type='application/json')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def vendor_payload(self):
+        number = next(_unique)
+        return {'name': f'Load Vendor {number}', 'contact_details': number, 'address': 'Load test',
+                'vendor_code': f'LT{number}'}
+
+    def new_vendor(self):
+        payload = self.vendor_payload()
+        self.call('post', '/api/vendors', payload)
+        return payload
+
+    def vendor(self):
+        return self.rng.choice(self.vendors) if self.vendors else (self.own_vendor['vendor_code'], self.own_vendor['name'])
+
+    def order_payload(self):
+        return {'vendor_name': self.vendor()[1], 'items': {'Pen': self.rng.randint(1, 50)},
+                'quantity': self.rng.randint(1, 500),
+                'delivery_date': (timezone.now() + timedelta(days=self.rng.randint(3, 30))).isoformat()}
+
+    def new_order(self):
+        """ A PO owned by this session's user, so it may be updated and deleted """
+        payload = dict(self.order_payload(), vendor_name=self.own_vendor['name'])
+        return self.call('post', '/api/purchase_orders', payload).json()['data']['po_number']
+
+    def po_number(self):
+        return self.rng.choice(self.po_numbers) if self.po_numbers else self.new_order()
+
+
+def _acknowledged_order(session):
+    po_number = session.new_order()
+    session.call('post', f'/api/purchase_orders/{po_number}/acknowledge')
+    return po_number
+
+
+# Every route in Vendor/urls.py with each method it serves. A scenario may make
+# unmeasured setup calls (e.g. create the PO it deletes) and returns the measured one.
+SCENARIOS = {
+    'POST signup': lambda s: ('post', '/api/signup', {'username': f'load{next(_unique)}', 'password': 'load-test-1234'}),
+    'POST login': lambda s: ('post', '/api/login', {'username': s.user.username, 'password': s.password}),
+    'POST token/refresh': lambda s: ('post', '/api/token/refresh', {'refresh': str(RefreshToken.for_user(s.user))}),
+    'POST logout': lambda s: ('post', '/api/logout', {'refresh': str(RefreshToken.for_user(s.user))}),
+    'GET vendors': lambda s: ('get', '/api/vendors', {'page_size': s.page_size}),
+    'POST vendors': lambda s: ('post', '/api/vendors', s.vendor_payload()),
+    'GET vendors/<id>': lambda s: ('get', f'/api/vendors/{s.vendor()[0]}', None),
+    'PUT vendors/<id>': lambda s: ('put', f'/api/vendors/{s.own_vendor["vendor_code"]}',
+                                   {'address': f'Load test {next(_unique)}'}),
+    'DELETE vendors/<id>': lambda s: ('delete', f'/api/vendors/{s.new_vendor()["vendor_code"]}', None),
+    'GET vendors/<id>/performance': lambda s: ('get', f'/api/vendors/{s.vendor()[0]}/performance', None),
+    'GET vendors/<id>/performance/history': lambda s: ('get', f'/api/vendors/{s.vendor()[0]}/performance/history',
+                                                       {'from': (timezone.now() - timedelta(days=90)).date().isoformat(),
+                                                        'to': timezone.now().date().isoformat()}),
+    'GET performance/response_time': lambda s: ('get', '/api/performance/response_time', None),
+    'GET purchase_orders': lambda s: ('get', '/api/purchase_orders', {'page_size': s.page_size}),
+    'POST purchase_orders': lambda s: ('post', '/api/purchase_orders', s.order_payload()),
+    'POST purchase_orders/bulk': lambda s: ('post', '/api/purchase_orders/bulk', [s.order_payload() for _ in range(10)]),
+    'GET purchase_orders/export': lambda s: ('get', '/api/purchase_orders/export', None),
+    'GET purchase_orders/<id>': lambda s: ('get', f'/api/purchase_orders/{s.po_number()}', None),
+    'PUT purchase_orders/<id>': lambda s: ('put', f'/api/purchase_orders/{_acknowledged_order(s)}',
+                                           {'status': 'Completed', 'quality_rating': s.rng.randint(1, 10)}),
+    'DELETE purchase_orders/<id>': lambda s: ('delete', f'/api/purchase_orders/{s.new_order()}', None),
+    'POST purchase_orders/<id>/acknowledge': lambda s: ('post', f'/api/purchase_orders/{s.new_order()}/acknowledge', None),
+    'GET changes/<resource>': lambda s: ('get', f'/api/changes/{s.rng.choice(["vendors", "purchase_orders"])}',
+                                         {'updated_since': (timezone.now() - timedelta(days=1)).isoformat(),
+                                          'page_size': s.page_size}),
+    'GET cache_stats': lambda s: ('get', '/api/cache_stats', None),
+}
+
+
+def summarize(timings, statuses, wall_seconds):
+    endpoints = {}
+    for label in sorted(statuses):
+        values = sorted(timings[label])
+        endpoints[label] = {
+            'requests': sum(statuses[label].values()),
+            'errors': sum(count for code, count in statuses[label].items() if code == 'exception' or code >= 400),
+            'statuses': {str(code): count for code, count in sorted(statuses[label].items(), key=str)},
+            'throughput_rps': round(len(values) / wall_seconds, 2),
+            'mean_ms': round(1000 * sum(values) / len(values), 2) if values else None,
+            'p50_ms': round(1000 * percentile(values, 0.50), 2) if values else None,
+            'p95_ms': round(1000 * percentile(values, 0.95), 2) if values else None,
+            'p99_ms': round(1000 * percentile(values, 0.99), 2) if values else None,
+            'max_ms': round(1000 * values[-1], 2) if values else None,
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'seconds': round(wall_seconds, 3),
+        'requests': total,
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'throughput_rps': round(total / wall_seconds, 2),
+        'endpoints': endpoints,
+    }
+
+
+def run_load(user, password, scenarios=None, requests=50, concurrency=8, sample=1000, seed=0, **session_options):
+    """
+    Send `requests` requests to each scenario from `concurrency` threads, the
+    scenarios shuffled together, and return per-endpoint latency percentiles.
+    """
+    scenarios = scenarios or list(SCENARIOS)
+    vendors, po_numbers = sample_fixtures(sample)
+    plan = [label for label in scenarios for _ in range(requests)]
+    random.Random(seed).shuffle(plan)
+    jobs = queue.SimpleQueue()
+    for label in plan:
+        jobs.put(label)
+
+    lock = threading.Lock()
+    timings, statuses = defaultdict(list), defaultdict(Counter)
+
+    def worker(index):
+        try:
+            session = Session(user, password, vendors, po_numbers, random.Random(seed + index), **session_options)
+            while True:
+                try:
+                    label = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    method, path, data = SCENARIOS[label](session)
+                    started = time.perf_counter()
+                    response = session.call(method, path, data)
+                    elapsed = time.perf_counter() - started
+                except Exception:
+                    with lock:
+                        statuses[label]['exception'] += 1
+                    continue
+                with lock:
+                    timings[label].append(elapsed)
+                    statuses[label][response.status_code] += 1
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(timings, statuses, time.perf_counter() - started)
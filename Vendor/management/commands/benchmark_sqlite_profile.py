@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+from VMS.sqlite_wal.base import DEFAULT_PRAGMAS
+
+
+SCHEMA = [
+    'CREATE TABLE vendor (id INTEGER PRIMARY KEY, total_orders INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE purchaseorder (po_number TEXT PRIMARY KEY, vendor_id INTEGER NOT NULL, '
+    'items TEXT NOT NULL, created_at REAL NOT NULL)',
+    'CREATE INDEX purchaseorder_vendor ON purchaseorder (vendor_id)',
+]
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    if profile:
+        for name, value in DEFAULT_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def run(path, profile, threads, transactions, vendors):
+    """ Replay the PO save transaction (read vendor, insert PO, bump counters) from concurrent writers """
+    setup = connect(path, profile)
+    for statement in SCHEMA:
+        setup.execute(statement)
+    setup.executemany('INSERT INTO vendor (id) VALUES (?)', [(vendor,) for vendor in range(vendors)])
+    setup.close()
+
+    committed, locked = [0] * threads, [0] * threads
+
+    def writer(worker):
+        conn = connect(path, profile)
+        for number in range(transactions):
+            vendor = (worker + number) % vendors
+            try:
+                conn.execute('BEGIN IMMEDIATE' if profile else 'BEGIN')
+                conn.execute('SELECT total_orders FROM vendor WHERE id = ?', (vendor,)).fetchone()
+                conn.execute('INSERT INTO purchaseorder VALUES (?, ?, ?, ?)',
+                             (f'{worker}-{number}', vendor, '{"Pen": 6}', time.time()))
+                conn.execute('UPDATE vendor SET total_orders = total_orders + 1 WHERE id = ?', (vendor,))
+                conn.execute('COMMIT')
+                committed[worker] += 1
+            except sqlite3.OperationalError:
+                locked[worker] += 1
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+        conn.close()
+
+    workers = [threading.Thread(target=writer, args=(worker,)) for worker in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'committed': sum(committed),
+        'locked_errors': sum(locked),
+        'seconds': round(elapsed, 3),
+        'commits_per_second': round(sum(committed) / elapsed, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent PO write throughput on SQLite with and without the VMS.sqlite_wal profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--transactions', type=int, default=250, help='Transactions per thread')
+        parser.add_argument('--vendors', type=int, default=4)
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in (('default', False), ('production_profile', True)):
+                results[name] = run(os.path.join(directory, f'{name}.sqlite3'), profile,
+                                    options['threads'], options['transactions'], options['vendors'])
+        self.stdout.write(json.dumps(results, indent=2))
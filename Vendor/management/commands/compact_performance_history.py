@@ -0,0 +1,11 @@
+import json
+from django.core.management.base import BaseCommand
+from Vendor.history import compact_all_history
+
+
+class Command(BaseCommand):
+    help = ('Downsample old vendor performance history into hourly, daily and monthly rollups '
+            'and drop rollups past PERFORMANCE_HISTORY_RETENTION')
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(compact_all_history(), indent=2))
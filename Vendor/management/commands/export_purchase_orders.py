@@ -0,0 +1,20 @@
+import sys
+from django.core.management.base import BaseCommand
+from Vendor.export import EXPORT_FORMATS, export_purchase_orders
+
+
+class Command(BaseCommand):
+    help = 'Stream every purchase order as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--output', help='File to write to, defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        lines = export_purchase_orders(options['output_format'], chunk_size=options['chunk_size'])
+        if not options['output']:
+            sys.stdout.writelines(lines)
+            return
+        with open(options['output'], 'w', newline='') as output:
+            output.writelines(lines)
@@ -0,0 +1,32 @@
+import json
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from Vendor.loadgen import generate
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert load-test vendors and purchase orders with realistic status/acknowledgement mixes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--prefix', default='LOAD', help='Vendor code/name prefix, must not be in use yet')
+        parser.add_argument('--days', type=int, default=365, help='Spread order dates over this many past days')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--owner', help='Username the generated rows are created by')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner, _ = User.objects.get_or_create(username=options['owner'])
+
+        started = time.perf_counter()
+        created = generate(options['vendors'], options['orders'], prefix=options['prefix'], days=options['days'],
+                           seed=options['seed'], batch_size=options['batch_size'], created_by=owner,
+                           progress=lambda created: self.stderr.write(
+                               f'{created["vendors"]} vendors, {created["orders"]} purchase orders'))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(json.dumps({**created, 'seconds': round(elapsed, 3),
+                                      'orders_per_second': round(created['orders'] / elapsed, 1)}, indent=2))
@@ -0,0 +1,42 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from Vendor.loadtest import SCENARIOS, run_load
+
+
+class Command(BaseCommand):
+    help = 'Drive every API route concurrently in-process and report per-endpoint throughput and latency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--endpoints', nargs='*', help='Substrings of the endpoint labels to run, e.g. "GET vendors"')
+        parser.add_argument('--username', default='loadtest')
+        parser.add_argument('--password', default='load-test-1234')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--sample', type=int, default=1000, help='Vendors and POs sampled per shard for reads')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='File to write the JSON report to, defaults to stdout')
+
+    def handle(self, *args, **options):
+        scenarios = list(SCENARIOS)
+        if options['endpoints']:
+            scenarios = [label for label in scenarios if any(part in label for part in options['endpoints'])]
+            if not scenarios:
+                raise CommandError(f'No endpoint matches, choose from: {", ".join(SCENARIOS)}')
+
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            user = User.objects.create_user(username=options['username'], password=options['password'])
+
+        report = run_load(user, options['password'], scenarios, requests=options['requests'],
+                          concurrency=options['concurrency'], sample=options['sample'], seed=options['seed'],
+                          host=options['host'], page_size=options['page_size'])
+        report['config'] = {key: options[key] for key in ('requests', 'concurrency', 'page_size', 'seed')}
+        output = json.dumps(report, indent=2)
+        if not options['output']:
+            self.stdout.write(output)
+            return
+        with open(options['output'], 'w') as handle:
+            handle.write(output + '\n')
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from Vendor.scorecard import process_all_dirty_vendors, flush_dirty_vendors
+
+
+class Command(BaseCommand):
+    help = 'Recompute metrics of vendors queued by PO saves when VENDOR_METRICS_MODE is "deferred"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the queue is idle')
+        parser.add_argument('--debounce', type=float, default=None,
+                            help='Seconds a vendor must stay queued before it is recomputed')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = flush_dirty_vendors()
+            self.stdout.write(self.style.SUCCESS(f'Recomputed {processed} vendors'))
+            return
+
+        while True:
+            processed = process_all_dirty_vendors(debounce=options['debounce'], batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f'Recomputed {processed} vendors')
+            else:
+                time.sleep(options['interval'])
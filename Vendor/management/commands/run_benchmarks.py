@@ -0,0 +1,44 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from Vendor.benchmarks import BENCHMARKS, regressions, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Time PO save, PO numbering and scorecard recomputation as vendor history grows, '
+            'and fail on regressions against the stored baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='POs of vendor history to benchmark against, e.g. 100 10000 1000000')
+        parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS))
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'))
+        parser.add_argument('--threshold', type=float,
+                            default=getattr(settings, 'BENCHMARK_REGRESSION_THRESHOLD', 0.5),
+                            help='Allowed slowdown against the baseline as a fraction, e.g. 0.5 for 50%%')
+        parser.add_argument('--min-delta-ms', type=float, default=0.1,
+                            help='Ignore slowdowns smaller than this, which are timer noise')
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(options['sizes'], options['benchmarks'], options['repeat'])
+        self.stdout.write(json.dumps(results, indent=2))
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+                handle.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {options["baseline"]}'))
+            return
+
+        try:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING('No baseline to compare against, run with --save-baseline'))
+            return
+        found = regressions(results, baseline, options['threshold'], options['min_delta_ms'])
+        if found:
+            raise CommandError('Benchmark regressions:\n' + '\n'.join(found))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
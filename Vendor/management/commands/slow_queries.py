@@ -0,0 +1,34 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from VMS.slowqueries import read_log, top_offenders
+
+
+class Command(BaseCommand):
+    help = 'Rank the queries in the slow-query log by total time, grouped by fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(getattr(settings, 'SLOW_QUERY_LOG', '') or ''))
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            records = read_log(options['log'])
+        except FileNotFoundError:
+            raise CommandError(f'No slow-query log at {options["log"]!r}')
+        offenders = top_offenders(records, options['top'])
+        if options['json']:
+            self.stdout.write(json.dumps(offenders, indent=2))
+            return
+        for rank, entry in enumerate(offenders, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{rank} {entry["count"]} runs, {entry["total_ms"]} ms total, '
+                f'{entry["mean_ms"]} ms mean, {entry["max_ms"]} ms max'))
+            self.stdout.write(f'  {entry["fingerprint"]}')
+            if entry['full_scans']:
+                self.stdout.write(self.style.WARNING(f'  full scan of: {", ".join(entry["full_scans"])}'))
+            for line in entry['plan'] or []:
+                self.stdout.write(f'  plan: {line}')
+            for site in entry['call_sites']:
+                self.stdout.write(f'  from: {site}')
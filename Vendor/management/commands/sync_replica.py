@@ -0,0 +1,35 @@
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto the local read replicas with the online backup API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep syncing every N seconds instead of copying once')
+
+    def sync(self):
+        primary = sqlite3.connect(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                replica = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    primary.backup(replica)
+                finally:
+                    replica.close()
+        finally:
+            primary.close()
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            raise CommandError('No read replica configured, set VMS_READ_REPLICA')
+        while True:
+            self.sync()
+            self.stdout.write(f'Synced {", ".join(settings.DATABASE_REPLICAS)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_counters(apps, schema_editor):
+    Vendor = apps.get_model('Vendor', 'Vendor')
+    PurchaseOrder = apps.get_model('Vendor', 'PurchaseOrder')
+    completed = Q(status='Completed')
+    totals = PurchaseOrder.objects.values('vendor').annotate(
+        total=Count('pk'),
+        completed=Count('pk', filter=completed),
+        on_time=Count('pk', filter=Q(on_time_delivery=True)),
+        rating_sum=Sum('quality_rating', filter=completed),
+        rating_count=Count('quality_rating', filter=completed),
+        response_sum=Sum('response_time'),
+        response_count=Count('response_time'),
+    )
+    for row in totals:
+        Vendor.objects.filter(pk=row['vendor']).update(
+            total_orders=row['total'], completed_orders=row['completed'], on_time_orders=row['on_time'],
+            quality_rating_sum=row['rating_sum'] or 0, quality_rating_count=row['rating_count'],
+            response_time_sum=row['response_sum'] or 0, response_time_count=row['response_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='completed_orders',
+            field=models.PositiveIntegerField(default=0, help_text='Number of completed POs'),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='on_time_orders',
+            field=models.PositiveIntegerField(default=0, help_text='Number of POs delivered on time'),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='quality_rating_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of rated completed POs'),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='quality_rating_sum',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of quality ratings on completed POs', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='response_time_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of acknowledged POs'),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='response_time_sum',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Sum of acknowledgement response times in hours', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='total_orders',
+            field=models.PositiveIntegerField(default=0, help_text='Number of POs raised'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
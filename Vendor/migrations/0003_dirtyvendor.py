@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0002_vendor_scorecard_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyVendor',
+            fields=[
+                ('vendor', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='Vendor.vendor')),
+                ('marked_at', models.DateTimeField(auto_now_add=True, help_text='When the vendor first needed a metrics recompute')),
+            ],
+        ),
+    ]
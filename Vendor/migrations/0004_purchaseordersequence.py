@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:30
+
+from datetime import datetime
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    PurchaseOrder = apps.get_model('Vendor', 'PurchaseOrder')
+    PurchaseOrderSequence = apps.get_model('Vendor', 'PurchaseOrderSequence')
+    last_numbers = {}
+    for po_number in PurchaseOrder.objects.values_list('po_number', flat=True).iterator():
+        parts = po_number.rsplit('-', 2)
+        if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+            continue
+        try:
+            day = datetime.strptime(parts[1], '%Y%m%d').date()
+        except ValueError:
+            continue
+        key = (parts[0], day)
+        last_numbers[key] = max(last_numbers.get(key, 0), int(parts[2]))
+    PurchaseOrderSequence.objects.bulk_create([
+        PurchaseOrderSequence(vendor_code=vendor_code, date=day, last_number=last_number)
+        for (vendor_code, day), last_number in last_numbers.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0003_dirtyvendor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vendor_code', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('last_number', models.PositiveIntegerField(default=0, help_text='Last PO number handed out for the day')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='purchaseordersequence',
+            constraint=models.UniqueConstraint(fields=('vendor_code', 'date'), name='unique_po_sequence'),
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
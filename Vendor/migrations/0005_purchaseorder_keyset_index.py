@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0004_purchaseordersequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['order_date', 'po_number'], name='po_order_date_idx'),
+        ),
+    ]
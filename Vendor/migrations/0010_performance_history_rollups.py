@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0009_vendor_sharding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historialperformance',
+            name='average_response_time_max',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='average_response_time_min',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='bucket',
+            field=models.CharField(choices=[('raw', 'Snapshot'), ('hour', 'Hourly'), ('day', 'Daily'), ('month', 'Monthly')], default='raw', help_text='A single snapshot, or a rollup of the period starting at created_at', max_length=5),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='fulfillment_rate_max',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='fulfillment_rate_min',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='on_time_delivery_rate_max',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='on_time_delivery_rate_min',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='quality_rating_avg_max',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='quality_rating_avg_min',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='samples',
+            field=models.PositiveIntegerField(default=1, help_text='Number of snapshots folded into this row'),
+        ),
+        migrations.AddIndex(
+            model_name='historialperformance',
+            index=models.Index(fields=['bucket', 'vendor', 'created_at'], name='history_compaction_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0010_performance_history_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historialperformance',
+            index=models.Index(fields=['vendor', 'created_at'], name='history_vendor_time_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:14
+
+from django.db import migrations, models
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Cast
+import django.db.models.deletion
+
+
+def backfill_daily_stats(apps, schema_editor):
+    using = schema_editor.connection.alias
+    PurchaseOrder = apps.get_model('Vendor', 'PurchaseOrder')
+    VendorDailyStats = apps.get_model('Vendor', 'VendorDailyStats')
+    completed = Q(status='Completed')
+    rows = PurchaseOrder.objects.using(using).annotate(day=Cast('order_date', DateField())).values('vendor_id', 'day').annotate(
+        total=Count('pk'),
+        completed=Count('pk', filter=completed),
+        on_time=Count('pk', filter=Q(on_time_delivery=True)),
+        rating_sum=Sum('quality_rating', filter=completed),
+        rating_count=Count('quality_rating', filter=completed),
+        response_sum=Sum('response_time'),
+        response_count=Count('response_time'),
+    ).order_by()
+    VendorDailyStats.objects.using(using).bulk_create([
+        VendorDailyStats(vendor_id=row['vendor_id'], date=row['day'], total_orders=row['total'],
+                         completed_orders=row['completed'], on_time_orders=row['on_time'],
+                         quality_rating_sum=row['rating_sum'] or 0, quality_rating_count=row['rating_count'],
+                         response_time_sum=row['response_sum'] or 0, response_time_count=row['response_count'])
+        for row in rows.iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0011_performance_history_vendor_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Day the POs were ordered')),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('completed_orders', models.PositiveIntegerField(default=0)),
+                ('on_time_orders', models.PositiveIntegerField(default=0)),
+                ('quality_rating_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quality_rating_count', models.PositiveIntegerField(default=0)),
+                ('response_time_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('response_time_count', models.PositiveIntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Vendor.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailystats',
+            constraint=models.UniqueConstraint(fields=('vendor', 'date'), name='unique_vendor_daily_stats'),
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop,
+                             hints={'model_name': 'vendordailystats'}),
+    ]
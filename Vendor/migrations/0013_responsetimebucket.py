@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:21
+
+import math
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+# Vendor.sketch.sketch_key as of this migration, at the default RESPONSE_TIME_SKETCH_ACCURACY of 0.01, so later
+# changes to the sketch or the setting don't change what it writes. Rebuild the buckets with rebuild_scorecards.
+ACCURACY = 0.01
+ZERO_KEY = -(2 ** 31)
+
+
+def sketch_key(value):
+    value = float(value)
+    if value <= 0:
+        return ZERO_KEY
+    return math.ceil(math.log(value) / math.log((1 + ACCURACY) / (1 - ACCURACY)))
+
+
+def backfill_response_time_buckets(apps, schema_editor):
+    using = schema_editor.connection.alias
+    PurchaseOrder = apps.get_model('Vendor', 'PurchaseOrder')
+    ResponseTimeBucket = apps.get_model('Vendor', 'ResponseTimeBucket')
+    rows = PurchaseOrder.objects.using(using).filter(response_time__isnull=False) \
+        .values('vendor_id', 'response_time').annotate(orders=Count('pk')).order_by()
+    buckets = Counter()
+    for row in rows.iterator():
+        buckets[row['vendor_id'], sketch_key(row['response_time'])] += row['orders']
+    ResponseTimeBucket.objects.using(using).bulk_create([
+        ResponseTimeBucket(vendor_id=vendor_id, key=key, count=count) for (vendor_id, key), count in buckets.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0012_vendordailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseTimeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.IntegerField(help_text='Logarithmic bucket of the acknowledgement response time')),
+                ('count', models.PositiveIntegerField(default=0, help_text='Number of POs whose response time falls in the bucket')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Vendor.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='responsetimebucket',
+            constraint=models.UniqueConstraint(fields=('vendor', 'key'), name='unique_response_time_bucket'),
+        ),
+        migrations.RunPython(backfill_response_time_buckets, migrations.RunPython.noop,
+                             hints={'model_name': 'responsetimebucket'}),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:15
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+
+
+METRIC_FIELDS = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+
+
+def backfill_rollup_sums(apps, schema_editor):
+    # Existing rollups only kept their period's last value, so it stands in for every snapshot they fold in
+    using = schema_editor.connection.alias
+    HistorialPerformance = apps.get_model('Vendor', 'HistorialPerformance')
+    rollups = HistorialPerformance.objects.using(using).exclude(bucket='raw')
+    for field in METRIC_FIELDS:
+        rollups.filter(**{f'{field}__isnull': False}).update(**{
+            f'{field}_sum': ExpressionWrapper(F(field) * F('samples'),
+                                              output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+            f'{field}_count': F('samples'),
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0013_responsetimebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historialperformance',
+            name='average_response_time_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='average_response_time_sum',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='fulfillment_rate_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='fulfillment_rate_sum',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='on_time_delivery_rate_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='on_time_delivery_rate_sum',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='quality_rating_avg_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historialperformance',
+            name='quality_rating_avg_sum',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.RunPython(backfill_rollup_sums, migrations.RunPython.noop,
+                             hints={'model_name': 'historialperformance'}),
+    ]
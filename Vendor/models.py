@@ -1,14 +1,29 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F
 from datetime import datetime
 from django.utils import timezone
 from django.contrib.auth.models import User
+from VMS.metrics import timed
+
+
+class RoutedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """ Insert through Model.save() so the routers see the instance and can pick its shard """
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
 
 
 class BaseModel(models.Model):
-    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # No database constraint: users stay on the default database while vendor data may sit on a shard
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True) 
 
+    objects = RoutedQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
@@ -26,6 +41,18 @@ class Vendor(BaseModel):
                                                 help_text='Average response time in hours')
     fulfillment_rate = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True,
                                            help_text='Percentage of Successful POs')
+    total_orders = models.PositiveIntegerField(default=0, help_text='Number of POs raised')
+    completed_orders = models.PositiveIntegerField(default=0, help_text='Number of completed POs')
+    on_time_orders = models.PositiveIntegerField(default=0, help_text='Number of POs delivered on time')
+    quality_rating_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                             help_text='Sum of quality ratings on completed POs')
+    quality_rating_count = models.PositiveIntegerField(default=0, help_text='Number of rated completed POs')
+    response_time_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                                            help_text='Sum of acknowledgement response times in hours')
+    response_time_count = models.PositiveIntegerField(default=0, help_text='Number of acknowledged POs')
+
+    class Meta:
+        indexes = [models.Index(fields=['updated_at', 'vendor_code'], name='vendor_updated_at_idx')]
     
     def __str__(self):
         return self.name
@@ -57,17 +84,39 @@ class PurchaseOrder(BaseModel):
                                         help_text='Time taken to acknowledge POs in hours')
     on_time_delivery = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['order_date', 'po_number'], name='po_order_date_idx'),
+            models.Index(fields=['updated_at', 'po_number'], name='po_updated_at_idx'),
+            models.Index(fields=['vendor', 'status'], name='po_vendor_status_idx'),
+            models.Index(fields=['vendor', 'order_date'], name='po_vendor_order_date_idx'),
+            models.Index(fields=['vendor', 'delivery_date'], name='po_vendor_delivery_date_idx'),
+            models.Index(fields=['vendor', 'order_date'], condition=models.Q(acknowledgment_date__isnull=True),
+                         name='po_unacknowledged_idx'),
+        ]
+
+    @staticmethod
+    def format_po_number(vendor_code, day, number):
+        return f'{vendor_code}-{day.strftime("%Y%m%d")}-{number:04d}'
+
+    @classmethod
+    def assign_po_numbers(cls, vendor, orders):
+        """ Number a batch of unsaved POs of one vendor with a single sequence reservation """
+        today = timezone.now().date()
+        using = router.db_for_write(PurchaseOrderSequence, instance=vendor)
+        first_number = PurchaseOrderSequence.reserve(vendor.vendor_code, today, count=len(orders), using=using)
+        for offset, order in enumerate(orders):
+            order.po_number = cls.format_po_number(vendor.vendor_code, today, first_number + offset)
+
+    @timed('PurchaseOrder.save')
     def save(self, *args, **kwargs):
         if not self.po_number:
-            today = timezone.now().date()
-            last_po = PurchaseOrder.objects.filter(vendor=self.vendor).order_by('-order_date').first()
-            if last_po:
-                last_number = int(last_po.po_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            self.po_number = f'{self.vendor.vendor_code}-{today.strftime("%Y%m%d")}-{new_number:04d}'
+            self.assign_po_numbers(self.vendor, [self])
+
+        self.compute_derived_fields()
+        super().save(*args, **kwargs)
 
+    def compute_derived_fields(self):
         format_string = "%Y-%m-%d %H:%M:%S"
         if self.issue_date and self.acknowledgment_date:
             acknowledgement_date= datetime.strptime(str(self.acknowledgment_date)[:19], format_string)
@@ -83,19 +132,133 @@ class PurchaseOrder(BaseModel):
                 self.on_time_delivery = True
         else:
             self.quality_rating = 0
-
-        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.po_number
 
 
+class PurchaseOrderSequence(models.Model):
+    vendor_code = models.CharField(max_length=50)
+    date = models.DateField()
+    last_number = models.PositiveIntegerField(default=0, help_text='Last PO number handed out for the day')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['vendor_code', 'date'], name='unique_po_sequence')]
+
+    @classmethod
+    def reserve(cls, vendor_code, day, count=1, using=None):
+        """ Atomically reserve `count` consecutive PO numbers and return the first one """
+        objects = cls.objects.db_manager(using)
+        with transaction.atomic(using=using):
+            objects.bulk_create([cls(vendor_code=vendor_code, date=day)], ignore_conflicts=True)
+            sequence = objects.filter(vendor_code=vendor_code, date=day)
+            sequence.update(last_number=F('last_number') + count)
+            last_number = sequence.values_list('last_number', flat=True).get()
+        return last_number - count + 1
+
+    def __str__(self):
+        return f'{self.vendor_code}-{self.date.strftime("%Y%m%d")}'
+
+
 class HistorialPerformance(BaseModel):
+    BUCKET_CHOICES = [('raw', 'Snapshot'), ('hour', 'Hourly'), ('day', 'Daily'), ('month', 'Monthly')]
+
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    bucket = models.CharField(max_length=5, choices=BUCKET_CHOICES, default='raw',
+                              help_text='A single snapshot, or a rollup of the period starting at created_at')
+    samples = models.PositiveIntegerField(default=1, help_text='Number of snapshots folded into this row')
     on_time_delivery_rate = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     quality_rating_avg = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     average_response_time = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     fulfillment_rate = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    # Lowest and highest value over a rollup's period; empty on snapshots, where they equal the value
+    on_time_delivery_rate_min = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    on_time_delivery_rate_max = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    quality_rating_avg_min = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    quality_rating_avg_max = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    average_response_time_min = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    average_response_time_max = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    fulfillment_rate_min = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    fulfillment_rate_max = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
+    # Sum and number of the snapshot values folded into a rollup, for means weighted by snapshot; empty on snapshots
+    on_time_delivery_rate_sum = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    on_time_delivery_rate_count = models.PositiveIntegerField(blank=True, null=True)
+    quality_rating_avg_sum = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    quality_rating_avg_count = models.PositiveIntegerField(blank=True, null=True)
+    average_response_time_sum = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    average_response_time_count = models.PositiveIntegerField(blank=True, null=True)
+    fulfillment_rate_sum = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    fulfillment_rate_count = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Compaction walks one bucket level's old rows vendor by vendor
+            models.Index(fields=['bucket', 'vendor', 'created_at'], name='history_compaction_idx'),
+            # History ranges and as-of lookups of one vendor
+            models.Index(fields=['vendor', 'created_at'], name='history_vendor_time_idx'),
+        ]
 
     def __str__(self):
         return self.vendor.name
+
+
+class VendorDailyStats(models.Model):
+    """ Scorecard counters of the POs a vendor was issued on one day, summed over a date range for windowed metrics """
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    date = models.DateField(help_text='Day the POs were ordered')
+    total_orders = models.PositiveIntegerField(default=0)
+    completed_orders = models.PositiveIntegerField(default=0)
+    on_time_orders = models.PositiveIntegerField(default=0)
+    quality_rating_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quality_rating_count = models.PositiveIntegerField(default=0)
+    response_time_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    response_time_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['vendor', 'date'], name='unique_vendor_daily_stats')]
+
+    def __str__(self):
+        return f'{self.vendor_id} {self.date}'
+
+
+class ResponseTimeBucket(models.Model):
+    """ One bucket of a vendor's response-time sketch (see Vendor/sketch.py); a vendor's rows are the whole sketch """
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    key = models.IntegerField(help_text='Logarithmic bucket of the acknowledgement response time')
+    count = models.PositiveIntegerField(default=0, help_text='Number of POs whose response time falls in the bucket')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['vendor', 'key'], name='unique_response_time_bucket')]
+
+    def __str__(self):
+        return f'{self.vendor_id} {self.key}'
+
+
+class DirtyVendor(models.Model):
+    vendor = models.OneToOneField(Vendor, primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False)
+    marked_at = models.DateTimeField(auto_now_add=True,
+                                     help_text='When the vendor first needed a metrics recompute')
+
+    def __str__(self):
+        return str(self.vendor_id)
+
+
+class Tombstone(models.Model):
+    model_name = models.CharField(max_length=50)
+    object_key = models.CharField(max_length=50, help_text='vendor_code or po_number of the deleted row')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['model_name', 'deleted_at', 'id'], name='tombstone_deleted_at_idx')]
+
+    def __str__(self):
+        return f'{self.model_name}:{self.object_key}'
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True, help_text='Row can be pruned once the token has expired')
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
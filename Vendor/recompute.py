@@ -0,0 +1,206 @@
+from array import array
+from collections import Counter, defaultdict
+from datetime import date
+from decimal import Context, Decimal
+from itertools import compress
+from django.db import transaction
+from django.utils import timezone
+from .models import Vendor, PurchaseOrder, VendorDailyStats, ResponseTimeBucket
+from .caching import invalidate_vendor
+from .scorecard import COUNTER_FIELDS, METRIC_FIELDS, metric_values, record_history, sync_vendor_rows
+from .sharding import vendor_shards
+from .sketch import sketch_key
+
+
+BACKFILL_FIELDS = ['response_time', 'on_time_delivery']
+CENT = Decimal('0.01')
+# How the database backend turns metric_expressions()' float results into decimals; rounding
+# through the same 15 digits keeps ties like 7.325 agreeing with rebuild_scorecards
+_FLOAT_CONTEXT = Context(prec=15)
+
+
+class OrderColumns:
+    """
+    The scorecard columns of a batch of POs, one typed array per column, in
+    (vendor, order day) order. Ratings and response times are kept as integer
+    cents, so sums are exact, with 0 where the PO does not count. `runs` holds
+    the index where each (vendor, day) group starts, plus the end.
+    """
+
+    def __init__(self):
+        self.vendor = array('q')
+        self.day = array('l')
+        self.completed = array('b')
+        self.on_time = array('b')
+        self.rated = array('b')
+        self.rating = array('q')
+        self.acknowledged = array('b')
+        self.response = array('q')
+        self.runs = array('q')
+
+    def __len__(self):
+        return len(self.vendor)
+
+    def append(self, vendor_id, order_date, status, quality_rating, response_time, on_time_delivery):
+        day = order_date.toordinal()
+        if not self.vendor or (self.vendor[-1], self.day[-1]) != (vendor_id, day):
+            self.runs.append(len(self.vendor))
+        completed = status == 'Completed'
+        rated = completed and quality_rating is not None
+        self.vendor.append(vendor_id)
+        self.day.append(day)
+        self.completed.append(completed)
+        self.on_time.append(bool(on_time_delivery))
+        self.rated.append(rated)
+        self.rating.append(int(quality_rating * 100) if rated else 0)
+        self.acknowledged.append(response_time is not None)
+        self.response.append(int(response_time * 100) if response_time is not None else 0)
+
+    def groups(self):
+        """ (vendor id, day, start, end) of every run of POs sharing a vendor and order day """
+        bounds = list(self.runs) + [len(self)]
+        for start, end in zip(bounds, bounds[1:]):
+            yield self.vendor[start], self.day[start], start, end
+
+
+def load_order_columns(vendor_ids, using=None, chunk_size=10000):
+    """ Stream the vendors' POs into OrderColumns, walking the (vendor, order_date) index """
+    columns = OrderColumns()
+    rows = PurchaseOrder.objects.db_manager(using).filter(vendor_id__in=vendor_ids).order_by('vendor_id', 'order_date') \
+        .values_list('vendor_id', 'order_date', 'status', 'quality_rating', 'response_time', 'on_time_delivery')
+    for row in rows.iterator(chunk_size=chunk_size):
+        columns.append(*row)
+    return columns
+
+
+def _cents(value):
+    return Decimal(value).scaleb(-2)
+
+
+def grouped_counters(columns):
+    """
+    Daily counters {(vendor id, day): {field: value}} from slice sums over
+    each (vendor, day) run, and response-time sketch buckets
+    {(vendor id, key): {'count': n}} from one Counter per run.
+    """
+    daily, buckets, keys = {}, Counter(), {}
+    for vendor_id, day, start, end in columns.groups():
+        acknowledged = columns.acknowledged[start:end]
+        daily[vendor_id, date.fromordinal(day)] = {
+            'total_orders': end - start,
+            'completed_orders': sum(columns.completed[start:end]),
+            'on_time_orders': sum(columns.on_time[start:end]),
+            'quality_rating_sum': _cents(sum(columns.rating[start:end])),
+            'quality_rating_count': sum(columns.rated[start:end]),
+            'response_time_sum': _cents(sum(columns.response[start:end])),
+            'response_time_count': sum(acknowledged),
+        }
+        for cents, count in Counter(compress(columns.response[start:end], acknowledged)).items():
+            if cents not in keys:
+                keys[cents] = sketch_key(_cents(cents))
+            buckets[vendor_id, keys[cents]] += count
+    return daily, {key: {'count': count} for key, count in buckets.items()}
+
+
+def _ratio(numerator, denominator, scale=1):
+    if not denominator:
+        return None
+    return _FLOAT_CONTEXT.create_decimal_from_float(float(numerator) * scale / denominator).quantize(CENT)
+
+
+def scorecard_metrics(counters, previous_on_time_rate=None):
+    """ The four metrics from a vendor's counters, as metric_expressions() computes them in SQL """
+    on_time_rate = _ratio(counters['on_time_orders'], counters['completed_orders'], 100)
+    return {
+        'fulfillment_rate': _ratio(counters['completed_orders'], counters['total_orders'], 100),
+        'on_time_delivery_rate': previous_on_time_rate if on_time_rate is None else on_time_rate,
+        'quality_rating_avg': _ratio(counters['quality_rating_sum'], counters['quality_rating_count']),
+        'average_response_time': _ratio(counters['response_time_sum'], counters['response_time_count']),
+    }
+
+
+def derived_order_fields(status, issue_date, acknowledgment_date, delivery_date, updated_at):
+    """
+    response_time and on_time_delivery as PurchaseOrder.compute_derived_fields
+    would set them. The completion time is not stored, only bounded by the last
+    update, so on_time_delivery is True for a completed PO due after that update
+    and None (keep the stored flag) otherwise: a PO re-rated after its due date
+    may still have been completed on time.
+    """
+    response_time = None
+    if issue_date and acknowledgment_date:
+        elapsed = acknowledgment_date.replace(microsecond=0) - issue_date.replace(microsecond=0)
+        # Rounded through the field like the float hours save() assigns
+        response_time = PurchaseOrder._meta.get_field('response_time').to_python(elapsed.total_seconds() / 3600).quantize(CENT)
+    on_time = True if status == 'Completed' and (delivery_date is None or delivery_date > updated_at) else None
+    return {'response_time': response_time, 'on_time_delivery': on_time}
+
+
+def backfill_orders(vendor_ids, fields, using=None, chunk_size=10000):
+    """ Rewrite `fields` (some of BACKFILL_FIELDS) of the vendors' POs where a derived value is known and differs """
+    orders = PurchaseOrder.objects.db_manager(using)
+    changed = defaultdict(list)
+    rows = orders.filter(vendor_id__in=vendor_ids).values_list(
+        'pk', 'status', 'issue_date', 'acknowledgment_date', 'delivery_date', 'updated_at', *fields)
+    for pk, *inputs in rows.iterator(chunk_size=chunk_size):
+        derived = derived_order_fields(*inputs[:5])
+        for field, current in zip(fields, inputs[5:]):
+            if derived[field] is not None and current != derived[field]:
+                changed[field, derived[field]].append(pk)
+    # One UPDATE per field and new value; bulk_update's CASE per row costs far more to build
+    for (field, value), pks in changed.items():
+        for start in range(0, len(pks), 500):
+            orders.filter(pk__in=pks[start:start + 500]).update(**{field: value})
+    return len({pk for pks in changed.values() for pk in pks})
+
+
+def recompute_vendors(vendors, using=None, backfill=(), chunk_size=10000):
+    """
+    Recompute the scorecards of `vendors` (all on `using`) from one streamed
+    pass over their POs, and write back only what changed: vendor counters and
+    metrics, daily stats and response-time buckets.
+    """
+    vendor_ids = [vendor.pk for vendor in vendors]
+    backfilled = backfill_orders(vendor_ids, list(backfill), using, chunk_size) if backfill else 0
+    columns = load_order_columns(vendor_ids, using, chunk_size)
+    daily, buckets = grouped_counters(columns)
+    counters = {vendor_id: dict.fromkeys(COUNTER_FIELDS, 0) for vendor_id in vendor_ids}
+    for (vendor_id, _), values in daily.items():
+        for field, value in values.items():
+            counters[vendor_id][field] += value
+
+    previous = {vendor.pk: metric_values(vendor) for vendor in vendors}
+    changed, now = [], timezone.now()
+    for vendor in vendors:
+        values = {**counters[vendor.pk], **scorecard_metrics(counters[vendor.pk], vendor.on_time_delivery_rate)}
+        if any(getattr(vendor, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(vendor, field, value)
+            vendor.updated_at = now
+            changed.append(vendor)
+    Vendor.objects.db_manager(using).bulk_update(changed, COUNTER_FIELDS + METRIC_FIELDS + ['updated_at'], batch_size=500)
+    sync_vendor_rows(VendorDailyStats, 'date', vendor_ids, daily, using)
+    sync_vendor_rows(ResponseTimeBucket, 'key', vendor_ids, buckets, using)
+    record_history(changed, previous, using)
+    if changed:
+        invalidate_vendor(*[vendor.vendor_code for vendor in changed])
+    return {'vendors': len(vendors), 'orders': len(columns), 'changed': len(changed), 'backfilled': backfilled}
+
+
+def recompute_scorecards(using=None, vendor_batch=500, backfill=(), chunk_size=10000, progress=None):
+    """ recompute_vendors() over every vendor on `using`, one transaction per batch of `vendor_batch` vendors """
+    if any(field not in BACKFILL_FIELDS for field in backfill):
+        raise ValueError(f'backfill fields should be among {", ".join(BACKFILL_FIELDS)}')
+    totals = Counter()
+    vendor_ids = list(Vendor.objects.db_manager(using).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(vendor_ids), vendor_batch):
+        with transaction.atomic(using=using):
+            vendors = list(Vendor.objects.db_manager(using).filter(pk__in=vendor_ids[start:start + vendor_batch]))
+            totals.update(recompute_vendors(vendors, using, backfill, chunk_size))
+        if progress:
+            progress(dict(totals))
+    return {field: totals[field] for field in ('vendors', 'orders', 'changed', 'backfilled')}
+
+
+def recompute_all_scorecards(**kwargs):
+    return {using: recompute_scorecards(using, **kwargs) for using in vendor_shards()}
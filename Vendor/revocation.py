@@ -0,0 +1,65 @@
+import threading
+import time
+from datetime import datetime
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .models import RevokedToken
+
+
+class RevocationStore:
+    """
+    Revoked refresh-token JTIs held in a process-local hash set in front of the
+    RevokedToken table. Membership checks never query; the set pulls rows
+    revoked by other processes and prunes expired JTIs (in memory and in the
+    table) at most once every TOKEN_REVOCATION_SYNC_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._last_id = 0
+        self._synced_at = None
+
+    def sync(self, force=False):
+        interval = getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 5)
+        with self._lock:
+            if not force and self._synced_at is not None and time.monotonic() - self._synced_at < interval:
+                return
+            self._synced_at = time.monotonic()
+            now = timezone.now()
+            for row_id, jti, expires_at in (RevokedToken.objects.filter(id__gt=self._last_id, expires_at__gt=now)
+                                            .values_list('id', 'jti', 'expires_at')):
+                self._revoked[jti] = expires_at
+                self._last_id = max(self._last_id, row_id)
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+        RevokedToken.objects.filter(expires_at__lte=now).delete()
+
+    def is_revoked(self, jti):
+        self.sync()
+        return jti in self._revoked
+
+    def revoke(self, token):
+        """ Revoke `token`; returns False when it had already been revoked """
+        jti = token[api_settings.JTI_CLAIM]
+        expires_at = datetime.fromtimestamp(token['exp'])
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+            revoked = True
+        except IntegrityError:
+            revoked = False
+        with self._lock:
+            self._revoked[jti] = expires_at
+        return revoked
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+            self._last_id = 0
+            self._synced_at = None
+
+
+revocation_store = RevocationStore()
@@ -0,0 +1,352 @@
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, Count, DateField, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+from .models import Vendor, PurchaseOrder, HistorialPerformance, DirtyVendor, VendorDailyStats, ResponseTimeBucket
+from .caching import invalidate_vendor
+from .sharding import scatter, vendor_shards
+from .sketch import merge, sketch_key
+
+
+COUNTER_FIELDS = ['total_orders', 'completed_orders', 'on_time_orders', 'quality_rating_sum',
+                  'quality_rating_count', 'response_time_sum', 'response_time_count']
+METRIC_FIELDS = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+ORDER_STATE_FIELDS = ['vendor_id', 'status', 'quality_rating', 'response_time', 'on_time_delivery', 'order_date']
+
+
+def _as_decimal(field_name, value):
+    """ Round a value the same way the PurchaseOrder column stores it """
+    if value is None:
+        return None
+    field = PurchaseOrder._meta.get_field(field_name)
+    return field.to_python(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+
+
+def order_state(order):
+    return {
+        'vendor_id': order.vendor_id,
+        'status': order.status,
+        'quality_rating': _as_decimal('quality_rating', order.quality_rating),
+        'response_time': _as_decimal('response_time', order.response_time),
+        'on_time_delivery': order.on_time_delivery,
+        'order_date': order.order_date,
+    }
+
+
+def order_day(state):
+    return state['order_date'].date() if state.get('order_date') else None
+
+
+def previous_order_state(order, using=None):
+    if order._state.adding:
+        return None
+    return PurchaseOrder.objects.db_manager(using).filter(pk=order.pk).values(*ORDER_STATE_FIELDS).first()
+
+
+def order_contribution(state):
+    """ Counter values a single PO adds to its vendor's scorecard """
+    completed = state['status'] == 'Completed'
+    rated = completed and state['quality_rating'] is not None
+    acknowledged = state['response_time'] is not None
+    return {
+        'total_orders': 1,
+        'completed_orders': int(completed),
+        'on_time_orders': int(bool(state['on_time_delivery'])),
+        'quality_rating_sum': state['quality_rating'] if rated else Decimal(0),
+        'quality_rating_count': int(rated),
+        'response_time_sum': state['response_time'] if acknowledged else Decimal(0),
+        'response_time_count': int(acknowledged),
+    }
+
+
+def _ratio(numerator, denominator, scale=1, default=None):
+    value = Cast(numerator, FloatField())
+    if scale != 1:
+        value = value * scale
+    return Case(
+        When(**{f'{denominator}__gt': 0}, then=value / F(denominator)),
+        default=Value(None) if default is None else default,
+        output_field=FloatField(),
+    )
+
+
+def metric_expressions():
+    """ Update expressions deriving the four scorecard metrics from the counter columns """
+    return {
+        'fulfillment_rate': _ratio('completed_orders', 'total_orders', scale=100),
+        'on_time_delivery_rate': _ratio('on_time_orders', 'completed_orders', scale=100,
+                                        default=F('on_time_delivery_rate')),
+        'quality_rating_avg': _ratio('quality_rating_sum', 'quality_rating_count'),
+        'average_response_time': _ratio('response_time_sum', 'response_time_count'),
+    }
+
+
+def _increment(model, lookups, delta, using=None):
+    """ Add `delta` to the columns of the `model` row matching `lookups`, creating the row on first use """
+    changes = {field: F(field) + value for field, value in delta.items() if value}
+    if not changes:
+        return
+    rows = model.objects.db_manager(using).filter(**lookups)
+    if rows.update(**changes) or any(value < 0 for value in delta.values()):
+        # A missing row has nothing to take away from, e.g. once a vendor's rows were cascade-deleted
+        return
+    # Each statement is atomic on its own: a concurrent first use loses the insert race and still adds its delta.
+    # The ORM's upsert can only overwrite columns, not add to them, so the row is created empty and then updated.
+    model.objects.db_manager(using).bulk_create([model(**lookups)], ignore_conflicts=True)
+    rows.update(**changes)
+
+
+def apply_daily_delta(vendor_id, day, delta, using=None):
+    """ Add a counter delta to the vendor's stats row for `day` """
+    _increment(VendorDailyStats, {'vendor_id': vendor_id, 'date': day}, delta, using)
+
+
+def apply_response_time_change(previous, current, using=None):
+    """ Move a PO between the buckets of its vendor's response-time sketch """
+    changes = Counter()
+    if previous and previous['response_time'] is not None:
+        changes[previous['vendor_id'], sketch_key(previous['response_time'])] -= 1
+    if current and current['response_time'] is not None:
+        changes[current['vendor_id'], sketch_key(current['response_time'])] += 1
+    for (vendor_id, key), delta in changes.items():
+        _increment(ResponseTimeBucket, {'vendor_id': vendor_id, 'key': key}, {'count': delta}, using)
+
+
+def apply_scorecard_delta(vendor_id, delta, using=None, day=None):
+    changes = {field: F(field) + value for field, value in delta.items() if value}
+    if not changes:
+        return
+    vendors = Vendor.objects.db_manager(using).filter(pk=vendor_id)
+    with transaction.atomic(using=using):
+        vendors.update(**changes)
+        vendors.update(updated_at=timezone.now(), **metric_expressions())
+        if day:
+            apply_daily_delta(vendor_id, day, delta, using)
+
+
+def apply_order_change(previous, current, using=None):
+    """
+    Move a vendor's counters from a PO's previous state to its current one.
+    Either side may be None for a created or deleted PO.
+    """
+    old = order_contribution(previous) if previous else {}
+    new = order_contribution(current) if current else {}
+    apply_response_time_change(previous, current, using)
+    if previous and current and (previous['vendor_id'], order_day(previous)) == (current['vendor_id'], order_day(current)):
+        apply_scorecard_delta(current['vendor_id'],
+                              {field: new[field] - old[field] for field in COUNTER_FIELDS}, using, order_day(current))
+        return
+    if previous:
+        apply_scorecard_delta(previous['vendor_id'], {field: -value for field, value in old.items()}, using,
+                              order_day(previous))
+    if current:
+        apply_scorecard_delta(current['vendor_id'], new, using, order_day(current))
+
+
+def add_orders_to_scorecards(orders):
+    """ Fold freshly inserted POs (e.g. from bulk_create, which sends no signals) into their vendors """
+    deltas, daily, buckets = {}, {}, Counter()
+    for order in orders:
+        state = order_state(order)
+        totals = deltas.setdefault((order._state.db, order.vendor_id), dict.fromkeys(COUNTER_FIELDS, 0))
+        day_totals = daily.setdefault((order._state.db, order.vendor_id, order_day(state)), dict.fromkeys(COUNTER_FIELDS, 0))
+        for field, value in order_contribution(state).items():
+            totals[field] += value
+            day_totals[field] += value
+        if state['response_time'] is not None:
+            buckets[order._state.db, order.vendor_id, sketch_key(state['response_time'])] += 1
+    for (using, vendor_id), delta in deltas.items():
+        if is_deferred():
+            mark_vendor_dirty(vendor_id, using)
+        else:
+            apply_scorecard_delta(vendor_id, delta, using)
+    if not is_deferred():
+        for (using, vendor_id, day), delta in daily.items():
+            apply_daily_delta(vendor_id, day, delta, using)
+        for (using, vendor_id, key), count in buckets.items():
+            _increment(ResponseTimeBucket, {'vendor_id': vendor_id, 'key': key}, {'count': count}, using)
+        invalidate_vendor(*{order.vendor.vendor_code for order in orders})
+
+
+def metric_values(vendor):
+    return {field: getattr(vendor, field) for field in METRIC_FIELDS}
+
+
+def record_history(vendors, previous, using=None):
+    """ Snapshot the vendors whose metrics differ from `previous` (vendor pk -> metric_values before the change) """
+    HistorialPerformance.objects.db_manager(using).bulk_create([
+        HistorialPerformance(created_by_id=vendor.created_by_id, vendor=vendor, **metric_values(vendor))
+        for vendor in vendors if metric_values(vendor) != previous.get(vendor.pk)
+    ])
+
+
+def is_deferred():
+    return getattr(settings, 'VENDOR_METRICS_MODE', 'sync') == 'deferred'
+
+
+def aggregate_daily_counters(vendor_ids, using=None):
+    """ Counter values per (vendor id, order day) of the given vendors, computed from their POs in one grouped query """
+    completed = Q(status='Completed')
+    rows = PurchaseOrder.objects.db_manager(using).filter(vendor_id__in=vendor_ids) \
+        .annotate(day=Cast('order_date', DateField())).values('vendor_id', 'day').annotate(
+        total_orders=Count('pk'),
+        completed_orders=Count('pk', filter=completed),
+        on_time_orders=Count('pk', filter=Q(on_time_delivery=True)),
+        quality_rating_sum=Sum('quality_rating', filter=completed),
+        quality_rating_count=Count('quality_rating', filter=completed),
+        response_time_sum=Sum('response_time'),
+        response_time_count=Count('response_time'),
+    ).order_by()
+    return {(row['vendor_id'], row['day']): {field: _rounded_sum(row[field]) for field in COUNTER_FIELDS} for row in rows}
+
+
+def _rounded_sum(value):
+    """ SQLite sums decimal columns as floats; round back to the columns' two places """
+    if isinstance(value, Decimal):
+        return value.quantize(Decimal('0.01'))
+    return value or 0
+
+
+def aggregate_response_time_buckets(vendor_ids, using=None):
+    """ Response-time sketch buckets of the given vendors, from their POs grouped by response time """
+    rows = PurchaseOrder.objects.db_manager(using).filter(vendor_id__in=vendor_ids, response_time__isnull=False) \
+        .values('vendor_id', 'response_time').annotate(orders=Count('pk')).order_by()
+    buckets = Counter()
+    for row in rows:
+        buckets[row['vendor_id'], sketch_key(row['response_time'])] += row['orders']
+    return {key: {'count': count} for key, count in buckets.items()}
+
+
+def sync_vendor_rows(model, key_field, vendor_ids, wanted, using=None):
+    """
+    Make the vendors' `model` rows match `wanted`, {(vendor id, key): {field: value}},
+    writing only the rows that differ
+    """
+    objects = model.objects.db_manager(using)
+    fields = list(next(iter(wanted.values()), {}))
+    existing = {(row['vendor_id'], row[key_field]): row
+                for row in objects.filter(vendor_id__in=vendor_ids).values('pk', 'vendor_id', key_field, *fields)}
+    stale = [row['pk'] for key, row in existing.items() if key not in wanted]
+    created, changed = [], []
+    for (vendor_id, key), values in wanted.items():
+        row = existing.get((vendor_id, key))
+        if row is None:
+            created.append(model(vendor_id=vendor_id, **{key_field: key}, **values))
+        elif any(row[field] != value for field, value in values.items()):
+            changed.append(model(pk=row['pk'], vendor_id=vendor_id, **{key_field: key}, **values))
+    if stale:
+        objects.filter(pk__in=stale).delete()
+    objects.bulk_create(created, batch_size=2000)
+    if changed:
+        objects.bulk_update(changed, fields, batch_size=500)
+
+
+def aggregate_counters(vendor_ids, using=None, daily=None):
+    """ Counter values for the given vendors, the sums of their daily counters """
+    counters = {vendor_id: {field: 0 for field in COUNTER_FIELDS} for vendor_id in vendor_ids}
+    for (vendor_id, _), values in (daily if daily is not None else aggregate_daily_counters(vendor_ids, using)).items():
+        for field, value in values.items():
+            counters[vendor_id][field] += value
+    return counters
+
+
+def rebuild_scorecards(vendor_ids, using=None):
+    """ Recompute counters and metrics of the given vendors (all on the `using` database) from scratch """
+    vendors = list(Vendor.objects.db_manager(using).filter(pk__in=vendor_ids))
+    if not vendors:
+        return 0
+    daily = aggregate_daily_counters([vendor.pk for vendor in vendors], using)
+    buckets = aggregate_response_time_buckets([vendor.pk for vendor in vendors], using)
+    counters = aggregate_counters([vendor.pk for vendor in vendors], using, daily)
+    previous = {vendor.pk: metric_values(vendor) for vendor in vendors}
+    for vendor in vendors:
+        for field, value in counters[vendor.pk].items():
+            setattr(vendor, field, value)
+    with transaction.atomic(using=using):
+        Vendor.objects.db_manager(using).bulk_update(vendors, COUNTER_FIELDS)
+        sync_vendor_rows(VendorDailyStats, 'date', list(counters), daily, using)
+        sync_vendor_rows(ResponseTimeBucket, 'key', list(counters), buckets, using)
+        Vendor.objects.db_manager(using).filter(pk__in=counters).update(updated_at=timezone.now(), **metric_expressions())
+        current = Vendor.objects.db_manager(using).in_bulk(list(counters))
+        for vendor in vendors:
+            for field in METRIC_FIELDS:
+                setattr(vendor, field, getattr(current[vendor.pk], field))
+        record_history(vendors, previous, using)
+    invalidate_vendor(*[vendor.vendor_code for vendor in vendors])
+    return len(vendors)
+
+
+def mark_vendor_dirty(vendor_id, using=None):
+    DirtyVendor.objects.db_manager(using).bulk_create([DirtyVendor(vendor_id=vendor_id)], ignore_conflicts=True)
+
+
+def process_dirty_vendors(debounce=None, batch_size=500, using=DEFAULT_DB_ALIAS):
+    """
+    Recompute one batch of vendors queued on the `using` database that have been
+    dirty for at least `debounce` seconds. Returns the number of entries consumed.
+    """
+    if debounce is None:
+        debounce = getattr(settings, 'VENDOR_METRICS_DEBOUNCE', 5)
+    cutoff = timezone.now() - timedelta(seconds=debounce)
+    queue = DirtyVendor.objects.db_manager(using)
+    with transaction.atomic(using=using):
+        vendor_ids = list(queue.filter(marked_at__lte=cutoff)
+                          .order_by('marked_at').values_list('vendor_id', flat=True)[:batch_size])
+        if not vendor_ids:
+            return 0
+        queue.filter(vendor_id__in=vendor_ids).delete()
+        rebuild_scorecards(vendor_ids, using)
+    return len(vendor_ids)
+
+
+def process_all_dirty_vendors(debounce=None, batch_size=500):
+    """ One batch from the queue of every vendor shard """
+    return sum(process_dirty_vendors(debounce, batch_size, using) for using in vendor_shards())
+
+
+def flush_dirty_vendors():
+    """ Drain the whole queue immediately, e.g. before asserting on metrics in tests """
+    processed = 0
+    while True:
+        count = process_all_dirty_vendors(debounce=0)
+        if not count:
+            return processed
+        processed += count
+
+
+def _window_ratio(numerator, denominator, scale=1):
+    if not denominator:
+        return None
+    return (Decimal(numerator) * scale / denominator).quantize(Decimal('0.01'))
+
+
+def window_metrics(vendor_id, days, using=None, today=None):
+    """
+    The four scorecard metrics over POs ordered in the last `days` days
+    (today included), summed from at most `days` daily stats rows.
+    """
+    since = (today or timezone.now().date()) - timedelta(days=days - 1)
+    totals = VendorDailyStats.objects.db_manager(using).filter(vendor_id=vendor_id, date__gte=since) \
+        .aggregate(**{field: Sum(field) for field in COUNTER_FIELDS})
+    totals = {field: value or 0 for field, value in totals.items()}
+    return {
+        'on_time_delivery_rate': _window_ratio(totals['on_time_orders'], totals['completed_orders'], 100),
+        'quality_rating_avg': _window_ratio(totals['quality_rating_sum'], totals['quality_rating_count']),
+        'average_response_time': _window_ratio(totals['response_time_sum'], totals['response_time_count']),
+        'fulfillment_rate': _window_ratio(totals['completed_orders'], totals['total_orders'], 100),
+    }
+
+
+def response_time_sketch(vendor_id, using=None):
+    return dict(ResponseTimeBucket.objects.db_manager(using).filter(vendor_id=vendor_id, count__gt=0)
+                .values_list('key', 'count'))
+
+
+def org_response_time_sketch():
+    """ Every vendor's sketch merged, one grouped query per shard """
+    return merge(*[dict(part) for part in scatter(ResponseTimeBucket.objects.filter(count__gt=0).values('key')
+                                                   .annotate(total=Sum('count')).values_list('key', 'total').order_by())])
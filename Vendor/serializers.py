@@ -1,7 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.validators import UniqueValidator
 from .models import *
+from .revocation import revocation_store
+from .scorecard import response_time_sketch
+from .sketch import percentiles
+from .sharding import is_sharded, scatter, using_shard
+from VMS.profiling import profile_section
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -22,24 +31,123 @@ class LoginSerializer(serializers.ModelSerializer):
         fields = ['username', 'password']
 
 
-class VendorSerializer(serializers.ModelSerializer):
+class ProfiledSerializerMixin:
+    """ Count validation and rendering towards the request's serializer time """
+
+    def run_validation(self, *args, **kwargs):
+        with profile_section('serializer'):
+            return super().run_validation(*args, **kwargs)
+
+    def to_representation(self, *args, **kwargs):
+        with profile_section('serializer'):
+            return super().to_representation(*args, **kwargs)
+
+
+class ShardedUniqueValidator(UniqueValidator):
+    """ UniqueValidator that checks every vendor shard, since each database only enforces uniqueness locally """
+
+    def __call__(self, value, serializer_field):
+        field_name = serializer_field.source_attrs[-1]
+        instance = getattr(serializer_field.parent, 'instance', None)
+        for queryset in scatter(self.filter_queryset(value, self.queryset, field_name)):
+            if instance is not None and (not is_sharded() or queryset.db == instance._state.db):
+                queryset = queryset.exclude(pk=instance.pk)
+            if queryset.exists():
+                raise serializers.ValidationError(self.message, code='unique')
+
+
+class ShardedModelSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    def create(self, validated_data):
+        """ Insert through Model.save() so the routers see the instance and can pick its shard """
+        instance = self.Meta.model(**validated_data)
+        instance.save()
+        return instance
+
+
+class VendorSerializer(ShardedModelSerializer):
     class Meta:
         model = Vendor
         exclude = ['id', 'created_at', 'updated_at']
         read_only_fields = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
-        extra_kwargs = {'created_by': {'write_only': True}}
+        extra_kwargs = {
+            'created_by': {'write_only': True},
+            'name': {'validators': [ShardedUniqueValidator(Vendor.objects.all())]},
+            'contact_details': {'validators': [ShardedUniqueValidator(Vendor.objects.all())]},
+            'vendor_code': {'validators': [ShardedUniqueValidator(Vendor.objects.all())]},
+        }
+
+    def validate_vendor_code(self, value):
+        if self.instance is not None and value != self.instance.vendor_code and is_sharded():
+            raise serializers.ValidationError('Vendor code decides the shard and cannot be changed')
+        return value
         
 
-class PerformanceSerializer(serializers.ModelSerializer):
+class PerformanceSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    response_time_percentiles = serializers.SerializerMethodField()
+
     class Meta:
         model = Vendor
-        fields = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+        fields = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate',
+                  'response_time_percentiles']
         read_only_fields = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
 
+    def get_response_time_percentiles(self, obj):
+        """ p50/p90/p99 from the vendor's response-time sketch """
+        if obj.pk is None:
+            return None
+        return percentiles(response_time_sketch(obj.pk, obj._state.db))
+
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(ShardedModelSerializer):
     class Meta:
         model = PurchaseOrder
         exclude = ['created_at', 'updated_at']
         read_only_fields = ['po_number', 'order_date', 'issue_date', 'acknowledgment_date', 'response_time', 'on_time_delivery']
         extra_kwargs = {'created_by': {'write_only': True}, 'vendor':{'write_only': True}}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('shard'):
+            self.fields['vendor'].queryset = using_shard(Vendor.objects.all(), self.context['shard'])
+
+
+class PurchaseOrderBulkSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    vendor_name = serializers.CharField(max_length=50, write_only=True)
+
+    class Meta:
+        model = PurchaseOrder
+        fields = ['vendor_name', 'delivery_date', 'items', 'quantity']
+
+
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as err:
+            raise InvalidToken(err.args[0])
+        if revocation_store.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken("Token is revoked")
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revocation_store.revoke(refresh):
+                raise InvalidToken("Token is revoked")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as err:
+            raise InvalidToken(err.args[0])
+        revocation_store.revoke(refresh)
+        return attrs
@@ -0,0 +1,104 @@
+import zlib
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+SHARDED_MODELS = {'vendor', 'purchaseorder', 'historialperformance', 'purchaseordersequence', 'dirtyvendor',
+                  'vendordailystats', 'responsetimebucket'}
+
+
+def vendor_shards():
+    return getattr(settings, 'VENDOR_SHARDS', None) or [DEFAULT_DB_ALIAS]
+
+
+def is_sharded():
+    return len(vendor_shards()) > 1
+
+
+def is_sharded_model(model):
+    return model._meta.app_label == 'Vendor' and model._meta.model_name in SHARDED_MODELS
+
+
+def shard_for_vendor_code(vendor_code):
+    """ Alias holding a vendor's rows; crc32 keeps the choice stable across processes and restarts """
+    shards = vendor_shards()
+    return shards[zlib.crc32(str(vendor_code).encode()) % len(shards)]
+
+
+def shard_for_po_number(po_number):
+    """ PO numbers are <vendor_code>-<YYYYMMDD>-<NNNN>, so the prefix names the vendor's shard """
+    return shard_for_vendor_code(str(po_number).rsplit('-', 2)[0])
+
+
+def shard_for_instance(instance):
+    # Unsaved rows may carry the db of a related object assigned to them, e.g. created_by
+    if instance._state.db and not instance._state.adding:
+        return instance._state.db
+    if hasattr(instance, 'vendor_code'):
+        return shard_for_vendor_code(instance.vendor_code)
+    if getattr(instance, 'po_number', None):
+        return shard_for_po_number(instance.po_number)
+    vendor = instance._meta.get_field('vendor').get_cached_value(instance, None)
+    return shard_for_instance(vendor) if vendor is not None else None
+
+
+def using_shard(queryset, alias):
+    """ `queryset` pinned to one shard; left to the routers when vendor data is not sharded """
+    return queryset.using(alias) if is_sharded() else queryset
+
+
+def on_vendor_shard(queryset, vendor_code):
+    return using_shard(queryset, shard_for_vendor_code(vendor_code))
+
+
+def on_order_shard(queryset, po_number):
+    return using_shard(queryset, shard_for_po_number(po_number))
+
+
+def scatter(queryset):
+    """ One copy of `queryset` per shard holding its model, for the caller to gather """
+    if not is_sharded_model(queryset.model):
+        return [queryset]
+    return [using_shard(queryset, alias) for alias in vendor_shards()]
+
+
+def scatter_get(queryset):
+    """ Like get() on a lookup that does not name the shard, e.g. a vendor by name """
+    for part in scatter(queryset):
+        row = part.first()
+        if row is not None:
+            return row
+    raise queryset.model.DoesNotExist(f'{queryset.model._meta.object_name} matching query does not exist.')
+
+
+class VendorShardRouter:
+    """
+    Partition Vendor and the rows hanging off a vendor across settings.VENDOR_SHARDS
+    by a hash of vendor_code. Saved instances and related lookups are routed from
+    the instance hint; queries without one must name their shard (see on_vendor_shard
+    and scatter) and otherwise fall through to the next router.
+    """
+
+    def _db_for_model(self, model, **hints):
+        if not is_sharded():
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if is_sharded_model(model):
+            return shard_for_instance(instance)
+        if instance._state.db != DEFAULT_DB_ALIAS and instance._state.db in vendor_shards():
+            # e.g. vendor.created_by: users only live on the default database
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_read = _db_for_model
+    db_for_write = _db_for_model
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in vendor_shards():
+            return None
+        return app_label == 'Vendor' and model_name in SHARDED_MODELS
@@ -1,26 +1,76 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Avg
 from .models import *
+from .scorecard import (COUNTER_FIELDS, METRIC_FIELDS, order_state, previous_order_state, metric_values,
+                        record_history, apply_order_change, is_deferred, mark_vendor_dirty)
+from .caching import invalidate_vendor
+from .authentication import forget_user
+from VMS.profiling import profiled
+from VMS.metrics import timed
+
+
+@receiver(pre_save, sender=PurchaseOrder)
+def capture_previous_order_state(sender, instance, raw=False, using=None, **kwargs):
+    instance._previous_state = None if raw or is_deferred() else previous_order_state(instance, using)
 
 
 @receiver(post_save, sender=PurchaseOrder)
-def update_vendor_avg_response_time(sender, instance, **kwargs):
+@timed('update_vendor_avg_response_time')
+@profiled('signals')
+def update_vendor_avg_response_time(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if is_deferred():
+        mark_vendor_dirty(instance.vendor_id, using)
+        return
+
     vendor = instance.vendor
-    if vendor.on_time_delivery_rate or vendor.quality_rating_avg or vendor.average_response_time or vendor.fulfillment_rate:
-        HistorialPerformance.objects.create(created_by=vendor.created_by, vendor=vendor, on_time_delivery_rate=vendor.on_time_delivery_rate,
-                                        quality_rating_avg=vendor.quality_rating_avg, average_response_time=vendor.average_response_time,
-                                        fulfillment_rate=vendor.fulfillment_rate)
-    
-    avg_response_time = PurchaseOrder.objects.filter(vendor=vendor, acknowledgment_date__isnull=False).aggregate(avg_response_time=Avg('response_time'))
-    vendor.average_response_time = avg_response_time['avg_response_time']
-    completed = PurchaseOrder.objects.filter(vendor=vendor, status="Completed").count()
-    total_orders = PurchaseOrder.objects.filter(vendor=vendor).count()
-    vendor.fulfillment_rate = completed / total_orders * 100
-    quality_rating = PurchaseOrder.objects.filter(vendor=vendor, status="Completed").aggregate(rating_avg=Avg('quality_rating'))
-    vendor.quality_rating_avg = quality_rating['rating_avg']
-    if completed:
-        on_time_delivery = PurchaseOrder.objects.filter(vendor=vendor, on_time_delivery=True).count()
-        vendor.on_time_delivery_rate = on_time_delivery / completed * 100
-
-    vendor.save()
+    previous_metrics = metric_values(vendor)
+    previous = getattr(instance, '_previous_state', None)
+    apply_order_change(previous, order_state(instance), using)
+    vendor.refresh_from_db(fields=COUNTER_FIELDS + METRIC_FIELDS)
+    record_history([vendor], {vendor.pk: previous_metrics}, using)
+    invalidate_vendor(vendor.vendor_code)
+    if previous and previous['vendor_id'] != vendor.pk:
+        invalidate_vendor(*Vendor.objects.db_manager(using).filter(pk=previous['vendor_id']).values_list('vendor_code', flat=True))
+
+
+def _deleting_vendor(origin):
+    return isinstance(origin, Vendor) or getattr(origin, 'model', None) is Vendor
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+@profiled('signals')
+def remove_order_from_scorecard(sender, instance, using=None, origin=None, **kwargs):
+    # On a cascade from the vendor its scorecard, daily stats and buckets are going away too
+    if not _deleting_vendor(origin):
+        if is_deferred():
+            mark_vendor_dirty(instance.vendor_id, using)
+        else:
+            apply_order_change(order_state(instance), None, using)
+            invalidate_vendor(instance.vendor.vendor_code)
+    Tombstone.objects.create(model_name=PurchaseOrder._meta.model_name, object_key=instance.po_number)
+
+
+@receiver(pre_save, sender=Vendor)
+def capture_previous_vendor_code(sender, instance, raw=False, using=None, **kwargs):
+    instance._previous_vendor_code = None
+    if not instance._state.adding:
+        instance._previous_vendor_code = Vendor.objects.db_manager(using).filter(pk=instance.pk).values_list('vendor_code', flat=True).first()
+
+
+@receiver(post_save, sender=Vendor)
+def invalidate_saved_vendor(sender, instance, **kwargs):
+    invalidate_vendor(instance.vendor_code, getattr(instance, '_previous_vendor_code', None))
+
+
+@receiver(post_delete, sender=Vendor)
+def invalidate_deleted_vendor(sender, instance, **kwargs):
+    invalidate_vendor(instance.vendor_code)
+    Tombstone.objects.create(model_name=Vendor._meta.model_name, object_key=instance.vendor_code)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance)
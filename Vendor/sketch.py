@@ -0,0 +1,62 @@
+import math
+from collections import Counter
+from decimal import Decimal
+from django.conf import settings
+
+
+# Bucket of zero (and negative) response times, below every logarithmic bucket
+ZERO_KEY = -(2 ** 31)
+PERCENTILES = {'p50': 0.50, 'p90': 0.90, 'p99': 0.99}
+
+
+def _gamma():
+    accuracy = getattr(settings, 'RESPONSE_TIME_SKETCH_ACCURACY', 0.01)
+    return (1 + accuracy) / (1 - accuracy)
+
+
+def sketch_key(value):
+    """
+    Logarithmic bucket of a response time (DDSketch): every value in bucket k
+    lies in (gamma^(k-1), gamma^k], so the bucket's estimate is within the
+    configured relative accuracy of any value in it.
+    """
+    if value is None:
+        return None
+    value = float(value)
+    if value <= 0:
+        return ZERO_KEY
+    return math.ceil(math.log(value) / math.log(_gamma()))
+
+
+def key_value(key):
+    if key == ZERO_KEY:
+        return 0.0
+    gamma = _gamma()
+    return 2 * gamma ** key / (gamma + 1)
+
+
+def merge(*sketches):
+    """ Sketches are {key: count}; merging adds counts, so it is exact and order-independent """
+    merged = Counter()
+    for sketch in sketches:
+        merged.update(sketch)
+    return {key: count for key, count in merged.items() if count}
+
+
+def quantile(sketch, fraction):
+    total = sum(sketch.values())
+    if not total:
+        return None
+    rank = fraction * (total - 1)
+    seen = 0
+    for key in sorted(sketch):
+        seen += sketch[key]
+        if seen > rank:
+            return key_value(key)
+    return key_value(max(sketch))
+
+
+def percentiles(sketch):
+    """ p50/p90/p99 in hours, rounded like the response time columns """
+    return {name: None if value is None else Decimal(value).quantize(Decimal('0.01'))
+            for name, value in ((name, quantile(sketch, fraction)) for name, fraction in PERCENTILES.items())}
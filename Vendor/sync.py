@@ -0,0 +1,72 @@
+import heapq
+from itertools import islice
+from operator import attrgetter
+from .models import Vendor, PurchaseOrder, Tombstone
+from .serializers import VendorSerializer, PurchaseOrderSerializer
+from .filters import parse_boundary
+from .pagination import encode_cursor, decode_cursor, get_page_size, rows_after
+from .sharding import scatter
+
+
+SYNC_RESOURCES = {
+    'vendors': (Vendor, 'vendor_code', VendorSerializer),
+    'purchase_orders': (PurchaseOrder, 'po_number', PurchaseOrderSerializer),
+}
+
+
+def tombstone_name(model):
+    return model._meta.model_name
+
+
+def _page_after(queryset, ordering, key, limit):
+    """ First `limit` rows after `key`, gathered from every shard holding the model """
+    if key:
+        queryset = queryset.filter(rows_after(ordering, key))
+    pages = [part.order_by(*ordering)[:limit] for part in scatter(queryset)]
+    return list(islice(heapq.merge(*pages, key=attrgetter(*ordering)), limit))
+
+
+def change_feed(request, resource):
+    """
+    Rows of `resource` changed and deleted after ?updated_since=, merged into one
+    stream ordered by time so a delete followed by a re-create replays correctly.
+    The cursor keeps a separate keyset position for each of the two streams.
+    """
+    if resource not in SYNC_RESOURCES:
+        raise ValueError(f'Unknown resource, use one of {", ".join(SYNC_RESOURCES)}')
+    if not request.query_params.get('updated_since'):
+        raise ValueError('updated_since is required')
+
+    model, key_field, serializer_class = SYNC_RESOURCES[resource]
+    since, _ = parse_boundary('updated_since', request.query_params['updated_since'])
+    page_size = get_page_size(request)
+    changed_key, deleted_key = None, None
+    if request.query_params.get('cursor'):
+        position = decode_cursor(request.query_params['cursor'])
+        if len(position) != 2:
+            raise ValueError('Invalid cursor')
+        changed_key, deleted_key = position
+
+    changed = _page_after(model.objects.filter(updated_at__gt=since), ['updated_at', key_field], changed_key,
+                          page_size + 1)
+    deleted = _page_after(Tombstone.objects.filter(model_name=tombstone_name(model), deleted_at__gt=since),
+                          ['deleted_at', 'id'], deleted_key, page_size + 1)
+    merged = sorted([(row.updated_at, 0, row) for row in changed] + [(row.deleted_at, 1, row) for row in deleted],
+                    key=lambda entry: entry[:2])
+    page = merged[:page_size]
+
+    upserts = [row for _, kind, row in page if kind == 0]
+    serialized = iter(serializer_class(upserts, many=True).data)
+    changes = []
+    for timestamp, kind, row in page:
+        if kind == 0:
+            changes.append({"op": "upsert", "key": getattr(row, key_field), "updated_at": timestamp,
+                            "data": next(serialized)})
+            changed_key = [timestamp, getattr(row, key_field)]
+        else:
+            changes.append({"op": "delete", "key": row.object_key, "deleted_at": timestamp})
+            deleted_key = [timestamp, row.id]
+
+    watermark = page[-1][0] if page else since
+    next_cursor = encode_cursor([changed_key, deleted_key]) if len(merged) > page_size else None
+    return {"changes": changes, "watermark": watermark}, next_cursor
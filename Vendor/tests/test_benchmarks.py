@@ -0,0 +1,45 @@
+import io
+import json
+import os
+import tempfile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from ..benchmarks import BENCHMARKS, regressions, run_benchmarks
+from ..models import *
+
+
+class BenchmarkTests(TestCase):
+    databases = '__all__'
+
+    def test_runs_every_benchmark_and_rolls_back(self):
+        results = run_benchmarks([20], repeat=2)
+        self.assertEqual(set(results['20']), set(BENCHMARKS))
+        self.assertEqual(results['20']['derived_fields']['queries'], 0)
+        self.assertGreater(results['20']['save_create']['queries'], 0)
+        self.assertFalse(Vendor.objects.exists())
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+    def test_regressions(self):
+        baseline = {'100': {'save_create': {'median_ms': 5.0, 'min_ms': 4.0, 'queries': 10}}}
+        self.assertEqual(regressions({'100': {'save_create': {'median_ms': 5.5, 'min_ms': 4.5, 'queries': 10}}},
+                                     baseline, threshold=0.5), [])
+        found = regressions({'100': {'save_create': {'median_ms': 9.0, 'min_ms': 8.0, 'queries': 11}}},
+                            baseline, threshold=0.5)
+        self.assertEqual(len(found), 2)
+        self.assertEqual(regressions({'1000': {'save_create': {'median_ms': 90, 'min_ms': 80, 'queries': 99}}},
+                                     baseline, threshold=0.5), [])
+
+    def test_command_fails_against_stricter_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command('run_benchmarks', '--sizes', '10', '--benchmarks', 'po_numbering', '--repeat', '2',
+                         '--baseline', path, '--save-baseline', stdout=io.StringIO())
+            with open(path) as handle:
+                baseline = json.load(handle)
+            baseline['10']['po_numbering']['queries'] -= 1
+            with open(path, 'w') as handle:
+                json.dump(baseline, handle)
+            with self.assertRaises(CommandError):
+                call_command('run_benchmarks', '--sizes', '10', '--benchmarks', 'po_numbering', '--repeat', '2',
+                             '--baseline', path, stdout=io.StringIO())
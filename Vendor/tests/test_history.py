@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from ..history import compact_history, history_retention, performance_history
+from ..models import *
+
+
+class HistoryCompactionTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        self.history = HistorialPerformance.objects.db_manager(self.vendor._state.db)
+
+    def snapshot(self, created_at, quality_rating_avg, fulfillment_rate=None):
+        row = HistorialPerformance.objects.create(vendor=self.vendor, created_by=self.user, fulfillment_rate=fulfillment_rate,
+                                                  quality_rating_avg=quality_rating_avg)
+        self.history.filter(pk=row.pk).update(created_at=created_at)
+
+    def test_snapshots_rolled_up_level_by_level(self):
+        self.snapshot(datetime(2026, 6, 1, 10, 5), 5, 40)
+        self.snapshot(datetime(2026, 6, 1, 10, 20), 9)
+        self.snapshot(datetime(2026, 6, 1, 10, 55), 7, 60)
+        self.snapshot(datetime(2026, 6, 1, 11, 30), 6)
+        self.snapshot(datetime(2026, 6, 14, 9, 0), 8)
+
+        result = compact_history(datetime(2026, 6, 15, 12, 30), self.vendor._state.db)
+        self.assertEqual(result['raw'], {'compacted': 4, 'created': 2})
+        self.assertEqual(self.history.filter(bucket='raw').count(), 1)
+        hour = self.history.get(bucket='hour', created_at=datetime(2026, 6, 1, 10))
+        self.assertEqual((hour.samples, hour.quality_rating_avg, hour.quality_rating_avg_min, hour.quality_rating_avg_max),
+                         (3, Decimal('7.00'), Decimal('5.00'), Decimal('9.00')))
+        self.assertEqual((hour.fulfillment_rate, hour.fulfillment_rate_min, hour.fulfillment_rate_max),
+                         (Decimal('60.00'), Decimal('40.00'), Decimal('60.00')))
+
+        compact_history(datetime(2026, 6, 15, 12, 30), self.vendor._state.db)
+        self.assertEqual(self.history.count(), 3)
+
+        compact_history(datetime(2026, 8, 1), self.vendor._state.db)
+        day = self.history.get(bucket='day', created_at=datetime(2026, 6, 1))
+        self.assertEqual((day.created_at, day.samples, day.quality_rating_avg, day.quality_rating_avg_min,
+                          day.quality_rating_avg_max), (datetime(2026, 6, 1), 4, Decimal('6.00'), Decimal('5.00'), Decimal('9.00')))
+        self.assertEqual(self.history.filter(bucket='hour').count(), 0)
+
+        with override_settings(PERFORMANCE_HISTORY_RETENTION={'month': 400}):
+            compact_history(datetime(2027, 7, 15), self.vendor._state.db)
+            self.assertEqual(list(self.history.values_list('bucket', 'created_at', 'samples')),
+                             [('month', datetime(2026, 6, 1), 5)])
+            compact_history(datetime(2027, 8, 15), self.vendor._state.db)
+        self.assertFalse(self.history.exists())
+
+    def test_mean_is_weighted_by_snapshots_across_compaction(self):
+        for minute, value in ((5, 5), (20, 9), (55, 7), (90, 6)):
+            self.snapshot(datetime(2026, 6, 1, 10) + timedelta(minutes=minute), value)
+
+        def daily_mean():
+            _, points = performance_history(self.history.all(), datetime(2026, 6, 1), datetime(2026, 6, 2), 'day')
+            return points[0]['quality_rating_avg']['avg']
+
+        self.assertEqual(daily_mean(), Decimal('6.75'))
+        compact_history(datetime(2026, 6, 15, 12, 30), self.vendor._state.db)
+        self.assertEqual(self.history.filter(bucket='hour').count(), 2)
+        self.assertEqual(daily_mean(), Decimal('6.75'))
+        compact_history(datetime(2026, 8, 1), self.vendor._state.db)
+        self.assertEqual(self.history.get().quality_rating_avg_count, 4)
+        self.assertEqual(daily_mean(), Decimal('6.75'))
+
+    def test_retention_must_grow_with_level(self):
+        with override_settings(PERFORMANCE_HISTORY_RETENTION={'raw': 60, 'hour': 30}):
+            with self.assertRaises(ValueError):
+                history_retention()
+
+
+class PerformanceHistoryAPITests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        rows = [(datetime(2026, 3, 1, 9), 6, None, None), (datetime(2026, 3, 1, 18), 8, None, None),
+                (datetime(2026, 3, 2), 5, 4, 7), (datetime(2026, 3, 5, 12), 9, None, None)]
+        for created_at, value, low, high in rows:
+            row = HistorialPerformance.objects.create(vendor=self.vendor, created_by=self.user, quality_rating_avg=value,
+                                                      quality_rating_avg_min=low, quality_rating_avg_max=high,
+                                                      bucket='raw' if low is None else 'day')
+            HistorialPerformance.objects.using(row._state.db).filter(pk=row.pk).update(created_at=created_at)
+
+    def test_downsampled_in_database(self):
+        with self.assertNumQueries(2, using=self.vendor._state.db):
+            response = self.client.get('/api/vendors/MAHI07/performance/history',
+                                       {'from': '2026-03-01', 'to': '2026-03-31', 'bucket': 'day'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['bucket'], 'day')
+        points = response.data['data']
+        self.assertEqual([point['period'] for point in points],
+                         [datetime(2026, 3, 1), datetime(2026, 3, 2), datetime(2026, 3, 5)])
+        self.assertEqual(points[0]['samples'], 2)
+        self.assertEqual(points[0]['quality_rating_avg'], {'min': Decimal('6.00'), 'max': Decimal('8.00'),
+                                                           'avg': Decimal('7.00')})
+        self.assertEqual(points[1]['quality_rating_avg'], {'min': Decimal('4.00'), 'max': Decimal('7.00'),
+                                                           'avg': Decimal('5.00')})
+
+        response = self.client.get('/api/vendors/MAHI07/performance/history', {'from': '2026-03-01', 'to': '2026-03-10'})
+        self.assertEqual(response.data['bucket'], 'hour')
+        self.assertEqual(len(response.data['data']), 4)
+
+        response = self.client.get('/api/vendors/MAHI07/performance/history', {'from': '2025-03-01', 'to': '2026-03-31'})
+        self.assertEqual(response.data['bucket'], 'day')
+
+    def test_as_of(self):
+        response = self.client.get('/api/vendors/MAHI07/performance/history', {'as_of': '2026-03-01T20:00:00'})
+        self.assertEqual(response.data['data']['quality_rating_avg'], Decimal('8.00'))
+        response = self.client.get('/api/vendors/MAHI07/performance/history', {'as_of': '2026-03-04'})
+        self.assertEqual(response.data['data']['bucket'], 'day')
+        response = self.client.get('/api/vendors/MAHI07/performance/history', {'as_of': '2026-02-01'})
+        self.assertIsNone(response.data['data'])
+
+    def test_invalid_parameters(self):
+        for params in ({'bucket': 'minute'}, {'from': '2020-01-01', 'to': '2026-01-01', 'bucket': 'hour'},
+                       {'from': '2026-03-05', 'to': '2026-03-01'}, {'as_of': 'yesterday'}):
+            response = self.client.get('/api/vendors/MAHI07/performance/history', params)
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/vendors/NOPE/performance/history').status_code, 400)
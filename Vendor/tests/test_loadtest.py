@@ -0,0 +1,64 @@
+import re
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import User
+from ..models import *
+from ..loadgen import generate
+from ..loadtest import SCENARIOS, percentile, run_load
+from ..scorecard import COUNTER_FIELDS, aggregate_counters
+from ..sharding import scatter, scatter_get
+from ..urls import urlpatterns
+
+
+class FixtureGeneratorTests(TestCase):
+    databases = '__all__'
+
+    def test_generates_consistent_vendors_and_orders(self):
+        created = generate(vendors=5, orders=300, prefix='GEN', days=30, batch_size=50)
+        self.assertEqual(created, {'vendors': 5, 'orders': 300})
+        self.assertEqual(sum(part.count() for part in scatter(Vendor.objects.filter(vendor_code__startswith='GEN'))), 5)
+        self.assertEqual(sum(part.count() for part in scatter(PurchaseOrder.objects.all())), 300)
+        statuses = {status for part in scatter(PurchaseOrder.objects.values_list('status', flat=True)) for status in part}
+        self.assertEqual(statuses, {'Pending', 'Completed', 'Cancelled'})
+        days = {day for part in scatter(PurchaseOrder.objects.values_list('order_date__date', flat=True)) for day in part}
+        self.assertGreater(len(days), 1)
+        for orders in scatter(PurchaseOrder.objects.all()):
+            self.assertFalse(orders.exclude(created_at=F('order_date'), issue_date=F('order_date')).exists())
+
+        for vendors in scatter(Vendor.objects.all()):
+            counters = aggregate_counters([vendor.pk for vendor in vendors], vendors.db)
+            for vendor in vendors:
+                self.assertEqual({field: getattr(vendor, field) for field in COUNTER_FIELDS}, counters[vendor.pk])
+                self.assertEqual(vendor.total_orders, vendor.purchaseorder_set.count())
+
+    def test_api_numbering_continues_after_generated_orders(self):
+        generate(vendors=1, orders=40, prefix='GEN', days=0)
+        vendor = scatter_get(Vendor.objects.all())
+        order = PurchaseOrder.objects.create(vendor=vendor, items={"Pen": 6}, quantity=5,
+                                             delivery_date="2099-04-02T17:43:59")
+        self.assertTrue(order.po_number.endswith('-0041'))
+
+
+class LoadDriverTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_scenarios_cover_url_patterns(self):
+        routes = {re.sub(r'<\w+:(\w+)>', r'<\1>', str(pattern.pattern)) for pattern in urlpatterns}
+        self.assertEqual({label.split(' ', 1)[1] for label in SCENARIOS}, routes)
+
+    def test_every_route_is_driven(self):
+        user = User.objects.create_user(username='loadtest', password='load-test-1234')
+        generate(vendors=3, orders=30, prefix='GEN', days=5)
+        report = run_load(user, 'load-test-1234', requests=2, concurrency=1, host='testserver')
+        self.assertEqual(set(report['endpoints']), set(SCENARIOS))
+        self.assertEqual(report['requests'], 2 * len(SCENARIOS))
+        self.assertEqual(report['errors'], 0, report['endpoints'])
+        for endpoint in report['endpoints'].values():
+            self.assertLessEqual(endpoint['p50_ms'], endpoint['p99_ms'])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+        self.assertIsNone(percentile([], 0.5))
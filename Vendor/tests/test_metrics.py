@@ -0,0 +1,79 @@
+import os
+import re
+import tempfile
+import threading
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from VMS.metrics import MmapedDict, collect, store
+from ..models import *
+
+
+def sample(text, line_start):
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class MetricsTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(METRICS_DIR=self.directory.name)
+        self.settings.enable()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.directory.cleanup()
+
+    def test_request_cache_and_function_metrics(self):
+        self.client.post('/api/purchase_orders', {"vendor_name": "Mahindra", "items": {"Pen": 6}, "quantity": 5,
+                                                  "delivery_date": "2099-04-02T17:43:59"}, format='json')
+        self.client.get('/api/vendors/MAHI07/performance')
+        self.client.get('/api/vendors/MAHI07/performance')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+
+        self.assertIn('# TYPE vms_http_request_duration_seconds histogram', text)
+        self.assertEqual(sample(text, 'vms_http_requests_total{method="POST",status="201",view="PurchaseOrders"}'), 1)
+        self.assertEqual(sample(text, 'vms_http_request_duration_seconds_count{method="GET",view="VendorsPerformance"}'), 2)
+        self.assertEqual(sample(text, 'vms_http_request_duration_seconds_bucket{le="+Inf",method="GET",view="VendorsPerformance"}'), 2)
+        self.assertEqual(sample(text, 'vms_cache_requests_total{kind="performance",result="hit"}'), 1)
+        self.assertEqual(sample(text, 'vms_cache_hit_ratio{kind="performance"}'), 0.5)
+        self.assertGreaterEqual(sample(text, 'vms_function_duration_seconds_count{function="PurchaseOrder.save"}'), 1)
+        self.assertGreaterEqual(
+            sample(text, 'vms_function_duration_seconds_count{function="update_vendor_avg_response_time"}'), 1)
+
+        buckets = [float(value) for _, value in sorted((float(le), value) for le, value in re.findall(
+            r'^vms_http_request_duration_seconds_bucket\{le="([^"]+)",method="GET",view="VendorsPerformance"\} (\S+)$', text, re.M))]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_scrape_restricted_to_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 403)
+
+    def test_threads_and_processes_are_summed(self):
+        threads = [threading.Thread(target=lambda: [store.inc('vms_test_total', {}) for _ in range(500)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        other = MmapedDict(os.path.join(self.directory.name, 'metrics_999999999.db'), initial_size=64)
+        for index in range(20):
+            other.inc(f'["vms_test_total", [["worker", "{index}"]]]', 1.5)
+        other.inc('["vms_test_total", []]', 3)
+        other.close()
+
+        text = collect()
+        self.assertEqual(sample(text, 'vms_test_total'), 2003)
+        self.assertEqual(sample(text, 'vms_test_total{worker="19"}'), 1.5)
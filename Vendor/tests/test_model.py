@@ -5,6 +5,8 @@ from ..models import *
 
 
 class UserModelTest(TestCase):
+    databases = '__all__'
+
     def test_create_user(self):
         username = "shivamsharma"
         password = "shivam1234"
@@ -43,6 +45,8 @@ class UserModelTest(TestCase):
 
 
 class VendorModelTests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.user = User.objects.create_user(username='shivamsharma', password='shivam@1234')
 
@@ -75,6 +79,8 @@ class VendorModelTests(TestCase):
 
 
 class PurchaseOrderModelTests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.user = User.objects.create_user(username='shivamsharma', password='shivam@1234')
         self.vendor = Vendor.objects.create(
@@ -104,6 +110,20 @@ class PurchaseOrderModelTests(TestCase):
         self.assertFalse(purchase_order.on_time_delivery)
         self.assertEqual(str(purchase_order), purchase_order.po_number)
 
+    def test_purchase_order_numbers_are_sequential(self):
+        first = PurchaseOrder.objects.create(vendor=self.vendor, delivery_date=datetime.now() + timedelta(days=7),
+                                             items={'Notebook': 10}, quantity=444, created_by=self.user)
+        second = PurchaseOrder.objects.create(vendor=self.vendor, delivery_date=datetime.now() + timedelta(days=7),
+                                              items={'Notebook': 10}, quantity=444, created_by=self.user)
+        today = timezone.now().date()
+        self.assertEqual(first.po_number, f'MI68-{today.strftime("%Y%m%d")}-0001')
+        self.assertEqual(second.po_number, f'MI68-{today.strftime("%Y%m%d")}-0002')
+
+        shard = self.vendor._state.db
+        self.assertEqual(PurchaseOrderSequence.reserve('MI68', today, count=50, using=shard), 3)
+        self.assertEqual(PurchaseOrderSequence.reserve('MI68', today, using=shard), 53)
+        self.assertEqual(PurchaseOrderSequence.objects.using(shard).get(vendor_code='MI68', date=today).last_number, 53)
+
     # def test_purchase_order_save_method(self):
     #     purchase_order = PurchaseOrder.objects.create(
     #         vendor=self.vendor,
@@ -117,6 +137,8 @@ class PurchaseOrderModelTests(TestCase):
 
 
 class HistorialPerformanceModelTests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.user = User.objects.create_user(username='shivamsharma', password='shivam@1234')
         self.vendor = Vendor.objects.create(
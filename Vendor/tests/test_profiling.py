@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from VMS.profiling import profile_section
+from ..models import *
+
+
+class ProfilingMiddlewareTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('vms.profiling', level='INFO') as logs:
+            response = self.client.post('/api/purchase_orders', {"vendor_name": "Mahindra", "items": {"Pen": 6},
+                                                                 "quantity": 5, "delivery_date": "2099-04-02T17:43:59"},
+                                        format='json')
+        timing = response['Server-Timing']
+        for section in ('db;', 'serializer;', 'signals;', 'total;'):
+            self.assertIn(section, timing)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'PurchaseOrders')
+        self.assertEqual(record['status'], 201)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertIn(f'desc="{record["db_queries"]} queries"', timing)
+        self.assertGreaterEqual(record['total_ms'], record['serializer_ms'])
+        self.assertNotIn('profile', record)
+
+    def test_profile_dumped_on_header(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(REQUEST_PROFILE_HEADER=True, REQUEST_PROFILE_DIR=directory):
+                self.client.get('/api/vendors/MAHI07')
+                self.assertEqual(os.listdir(directory), [])
+                with self.assertLogs('vms.profiling', level='INFO') as logs:
+                    self.client.get('/api/vendors/MAHI07', HTTP_X_PROFILE='1')
+            files = os.listdir(directory)
+            self.assertEqual(len(files), 1)
+            self.assertTrue(files[0].endswith('-GET-api_vendors_MAHI07.prof'))
+            self.assertEqual(json.loads(logs.records[-1].getMessage())['profile'], os.path.join(directory, files[0]))
+
+    def test_header_ignored_unless_enabled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(REQUEST_PROFILE_DIR=directory):
+                self.client.get('/api/vendors/MAHI07', HTTP_X_PROFILE='1')
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_section_outside_request_is_noop(self):
+        with profile_section('serializer'):
+            pass
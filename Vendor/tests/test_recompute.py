@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+from ..models import *
+from ..loadgen import generate
+from ..recompute import recompute_all_scorecards, recompute_scorecards, scorecard_metrics
+from ..scorecard import COUNTER_FIELDS, METRIC_FIELDS, metric_expressions, metric_values, rebuild_scorecards
+from ..sharding import scatter, scatter_get, vendor_shards
+
+
+class RecomputeScorecardTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        generate(vendors=6, orders=400, prefix='RECO', seed=3, created_by=self.user)
+
+    def snapshot(self):
+        vendors = {(vendors.db, vendor.pk): {field: getattr(vendor, field) for field in COUNTER_FIELDS + METRIC_FIELDS}
+                   for vendors in scatter(Vendor.objects.all()) for vendor in vendors}
+        daily = {(rows.db, *row) for rows in scatter(VendorDailyStats.objects.values_list('vendor_id', 'date', *COUNTER_FIELDS))
+                 for row in rows}
+        buckets = {(rows.db, *row) for rows in scatter(ResponseTimeBucket.objects.filter(count__gt=0)
+                                                       .values_list('vendor_id', 'key', 'count')) for row in rows}
+        return vendors, daily, buckets
+
+    def test_matches_rebuild_and_writes_only_changes(self):
+        expected = self.snapshot()
+        for vendors in scatter(Vendor.objects.all()):
+            vendors.update(total_orders=0, quality_rating_sum=0, fulfillment_rate=None)
+        for rows in scatter(VendorDailyStats.objects.all()):
+            rows.filter(pk__in=rows.values('pk')[:20]).delete()
+        for rows in scatter(ResponseTimeBucket.objects.all()):
+            rows.update(count=1)
+
+        results = recompute_all_scorecards().values()
+        self.assertEqual({field: sum(result[field] for result in results) for field in ('vendors', 'orders', 'changed', 'backfilled')},
+                         {'vendors': 6, 'orders': 400, 'changed': 6, 'backfilled': 0})
+        self.assertEqual(self.snapshot(), expected)
+
+        history = [part.count() for part in scatter(HistorialPerformance.objects.all())]
+        for using in vendor_shards():
+            if not Vendor.objects.using(using).exists():
+                continue
+            with self.assertNumQueries(7, using=using):
+                self.assertEqual(recompute_scorecards(using)['changed'], 0)
+        self.assertEqual([part.count() for part in scatter(HistorialPerformance.objects.all())], history)
+
+    def test_metric_rounding_agrees_with_sql(self):
+        # 322.30 / 44 = 7.325 and 236.70 / 36 = 6.575 sit on a rounding tie
+        vendors = [vendor for vendors in scatter(Vendor.objects.all()) for vendor in vendors][:2]
+        for vendor, (rating_sum, count) in zip(vendors, [('322.30', 44), ('236.70', 36)]):
+            counters = {'total_orders': count + 3, 'completed_orders': count, 'on_time_orders': count // 3,
+                        'quality_rating_sum': Decimal(rating_sum), 'quality_rating_count': count,
+                        'response_time_sum': Decimal('1489.29'), 'response_time_count': 65}
+            Vendor.objects.using(vendor._state.db).filter(pk=vendor.pk).update(**counters)
+            Vendor.objects.using(vendor._state.db).filter(pk=vendor.pk).update(**metric_expressions())
+            vendor.refresh_from_db()
+            self.assertEqual(scorecard_metrics(counters), metric_values(vendor))
+
+    def test_backfill_rederives_order_fields(self):
+        vendor = scatter_get(Vendor.objects.all())
+        issued = datetime.now() - timedelta(days=2)
+        order = PurchaseOrder.objects.create(vendor=vendor, items={"Pen": 6}, quantity=5, created_by=self.user,
+                                             delivery_date=datetime.now() + timedelta(days=7))
+        PurchaseOrder.objects.using(vendor._state.db).filter(pk=order.pk).update(
+            issue_date=issued, acknowledgment_date=issued + timedelta(hours=3, minutes=30), status='Completed',
+            quality_rating=9, response_time=None, on_time_delivery=False)
+
+        result = recompute_scorecards(vendor._state.db, backfill=['response_time', 'on_time_delivery'])
+        order.refresh_from_db()
+        self.assertEqual(order.response_time, Decimal('3.50'))
+        self.assertTrue(order.on_time_delivery)
+        self.assertGreaterEqual(result['backfilled'], 1)
+        rebuilt = self.snapshot()
+        rebuild_scorecards(list(Vendor.objects.using(vendor._state.db).values_list('pk', flat=True)), vendor._state.db)
+        self.assertEqual(self.snapshot(), rebuilt)
+
+        with self.assertRaises(ValueError):
+            recompute_scorecards(backfill=['status'])
+
+    def test_backfill_keeps_on_time_flag_of_order_edited_after_due_date(self):
+        vendor = scatter_get(Vendor.objects.all())
+        order = PurchaseOrder.objects.create(vendor=vendor, items={"Pen": 6}, quantity=5, created_by=self.user,
+                                             delivery_date=datetime.now() + timedelta(days=7))
+        order.status, order.quality_rating = 'Completed', 6
+        order.save()
+        self.assertTrue(order.on_time_delivery)
+        # The due date passes, then the PO is re-rated
+        PurchaseOrder.objects.using(vendor._state.db).filter(pk=order.pk).update(
+            delivery_date=datetime.now() - timedelta(days=1))
+        order.refresh_from_db()
+        order.quality_rating = 9
+        order.save()
+        order.refresh_from_db()
+        self.assertTrue(order.on_time_delivery)
+
+        recompute_scorecards(vendor._state.db, backfill=['on_time_delivery'])
+        order.refresh_from_db()
+        self.assertTrue(order.on_time_delivery)
+
+    def test_command_reports_per_database(self):
+        out, err = StringIO(), StringIO()
+        call_command('rebuild_scorecards', '--vendor-batch', '4', stdout=out, stderr=err)
+        results = json.loads(out.getvalue())
+        self.assertIn('Recomputed in', err.getvalue())
+        self.assertEqual(set(results), set(vendor_shards()))
+        self.assertEqual(sum(result['vendors'] for result in results.values()), 6)
+        self.assertEqual(sum(result['changed'] for result in results.values()), 0)
@@ -0,0 +1,35 @@
+from django.db import connections
+from django.test import TestCase, override_settings
+from VMS.routers import PrimaryReplicaRouter, ReplicaPinningMiddleware
+from ..models import *
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_stick_to_primary_after_write(self):
+        routes = []
+
+        def view(request):
+            routes.append(self.router.db_for_read(Vendor))
+            routes.append(self.router.db_for_write(Vendor))
+            routes.append(self.router.db_for_read(Vendor))
+
+        # TestCase wraps every test in a transaction, which on its own pins reads to the primary.
+        connection = connections['default']
+        in_atomic_block, connection.in_atomic_block = connection.in_atomic_block, False
+        try:
+            ReplicaPinningMiddleware(view)(None)
+            ReplicaPinningMiddleware(lambda request: routes.append(self.router.db_for_read(Vendor)))(None)
+        finally:
+            connection.in_atomic_block = in_atomic_block
+        self.assertEqual(routes, ['replica', 'default', 'default', 'replica'])
+
+    def test_reads_inside_transaction_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Vendor), 'default')
+
+    def test_replica_is_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'Vendor'))
+        self.assertIsNone(self.router.allow_migrate('default', 'Vendor'))
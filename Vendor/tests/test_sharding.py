@@ -0,0 +1,149 @@
+from datetime import date
+from unittest import skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from ..models import *
+from ..recompute import recompute_all_scorecards
+from ..sharding import VendorShardRouter, shard_for_po_number, shard_for_vendor_code
+
+
+def codes_per_shard():
+    """ One vendor code landing on each shard """
+    codes = {}
+    index = 0
+    while len(codes) < len(settings.VENDOR_SHARDS):
+        codes.setdefault(shard_for_vendor_code(f'VEND{index:02d}'), f'VEND{index:02d}')
+        index += 1
+    return codes
+
+
+@override_settings(VENDOR_SHARDS=['default', 'shard1', 'shard2'])
+class ShardHashTests(SimpleTestCase):
+    def test_po_number_prefix_names_vendor_shard(self):
+        for code in ('MAHI07', 'TATA-01', 'VEND00'):
+            po_number = PurchaseOrder.format_po_number(code, date(2024, 5, 10), 7)
+            self.assertEqual(shard_for_po_number(po_number), shard_for_vendor_code(code))
+
+    def test_vendor_codes_spread_over_shards(self):
+        self.assertEqual({shard_for_vendor_code(f'VEND{index:02d}') for index in range(50)},
+                         {'default', 'shard1', 'shard2'})
+
+
+# Run with e.g. VMS_SHARDS=3 python manage.py test Vendor.tests.test_sharding
+@skipUnless(len(settings.VENDOR_SHARDS) > 1, 'set VMS_SHARDS to 2 or more to test vendor sharding')
+class VendorShardingTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.codes = codes_per_shard()
+        for number, (shard, code) in enumerate(self.codes.items()):
+            response = self.client.post('/api/vendors', {'name': f'Vendor {code}', 'contact_details': 9876423450 + number,
+                                                         'address': 'Mumbai, India', 'vendor_code': code}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def create_order(self, code):
+        response = self.client.post('/api/purchase_orders', {'vendor_name': f'Vendor {code}', 'items': {'Pen': 6},
+                                                             'quantity': 5, 'delivery_date': '2099-04-02T17:43:59'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['data']['po_number']
+
+    def test_rows_live_on_vendor_shard(self):
+        for shard, code in self.codes.items():
+            self.assertTrue(Vendor.objects.using(shard).filter(vendor_code=code).exists())
+            self.assertEqual(Vendor.objects.using(shard).count(), 1)
+
+            po_number = self.create_order(code)
+            self.assertEqual(shard_for_po_number(po_number), shard)
+            self.assertTrue(PurchaseOrder.objects.using(shard).filter(po_number=po_number).exists())
+            self.assertTrue(PurchaseOrderSequence.objects.using(shard).filter(vendor_code=code).exists())
+
+    def test_detail_endpoints_use_shard(self):
+        for shard, code in self.codes.items():
+            po_number = self.create_order(code)
+            response = self.client.post(f'/api/purchase_orders/{po_number}/acknowledge')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.put(f'/api/purchase_orders/{po_number}', {'status': 'Completed', 'quality_rating': 8},
+                                       format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            response = self.client.get(f'/api/purchase_orders/{po_number}')
+            self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+            self.assertEqual(response.data['data']['status'], 'Completed')
+
+            response = self.client.get(f'/api/vendors/{code}')
+            self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+            self.assertEqual(response.data['data']['vendor_code'], code)
+
+            response = self.client.get(f'/api/vendors/{code}/performance')
+            self.assertEqual(response.data['data']['fulfillment_rate'], '100.00')
+            self.assertEqual(response.data['data']['quality_rating_avg'], '8.00')
+
+            response = self.client.delete(f'/api/purchase_orders/{po_number}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(Vendor.objects.using(shard).get(vendor_code=code).total_orders, 0)
+
+    def test_list_endpoints_gather_all_shards(self):
+        po_numbers = {self.create_order(code) for code in self.codes.values()}
+
+        seen, params = [], {'page_size': 1}
+        while True:
+            response = self.client.get('/api/vendors', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [vendor['vendor_code'] for vendor in response.data['data']]
+            if not response.data['next']:
+                break
+            params['cursor'] = response.data['next']
+        self.assertEqual(sorted(seen), sorted(self.codes.values()))
+
+        response = self.client.get('/api/purchase_orders')
+        self.assertEqual({order['po_number'] for order in response.data['data']}, po_numbers)
+
+        response = self.client.get('/api/purchase_orders/export')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(po_numbers))
+
+    def test_bulk_create_spans_shards(self):
+        rows = [{'vendor_name': f'Vendor {code}', 'items': {'Pen': 1}, 'quantity': 1,
+                 'delivery_date': '2099-04-02T17:43:59'} for code in self.codes.values()]
+        response = self.client.post('/api/purchase_orders/bulk', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        for shard, code in self.codes.items():
+            self.assertEqual(Vendor.objects.using(shard).get(vendor_code=code).total_orders, 1)
+
+    def test_scorecard_recompute_covers_every_shard(self):
+        for code in self.codes.values():
+            self.create_order(code)
+        for shard in self.codes:
+            Vendor.objects.using(shard).update(total_orders=5)
+        results = recompute_all_scorecards()
+        for shard, code in self.codes.items():
+            self.assertEqual(results[shard], {'vendors': 1, 'orders': 1, 'changed': 1, 'backfilled': 0})
+            self.assertEqual(Vendor.objects.using(shard).get(vendor_code=code).total_orders, 1)
+
+    def test_uniqueness_checked_across_shards(self):
+        first, second = list(self.codes.values())[:2]
+        response = self.client.post('/api/vendors', {'name': f'Vendor {first}', 'contact_details': 9000000001,
+                                                     'address': 'Pune, India', 'vendor_code': second + 'X'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+        # Negative Testing - vendor_code decides the shard
+        response = self.client.put(f'/api/vendors/{first}', {'vendor_code': 'MOVED01'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    def test_router_only_migrates_vendor_data_on_shards(self):
+        router = VendorShardRouter()
+        shard = settings.VENDOR_SHARDS[1]
+        self.assertTrue(router.allow_migrate(shard, 'Vendor', 'purchaseorder'))
+        self.assertFalse(router.allow_migrate(shard, 'Vendor', 'revokedtoken'))
+        self.assertFalse(router.allow_migrate(shard, 'auth', 'user'))
+        self.assertIsNone(router.allow_migrate('default', 'auth', 'user'))
@@ -0,0 +1,104 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from datetime import datetime, timedelta
+from decimal import Decimal
+from ..models import *
+from ..scorecard import flush_dirty_vendors, process_dirty_vendors
+
+
+class VendorScorecardTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        self.shard = self.vendor._state.db
+
+    def create_order(self, **kwargs):
+        return PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                            delivery_date=datetime.now() + timedelta(days=7),
+                                            created_by=self.user, **kwargs)
+
+    def test_counters_follow_order_lifecycle(self):
+        first = self.create_order()
+        second = self.create_order()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.total_orders, 2)
+        self.assertEqual(self.vendor.fulfillment_rate, Decimal('0.00'))
+        self.assertIsNone(self.vendor.average_response_time)
+
+        first.acknowledgment_date = first.issue_date + timedelta(hours=4)
+        first.save()
+        first.status = 'Completed'
+        first.quality_rating = 8
+        first.save()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.completed_orders, 1)
+        self.assertEqual(self.vendor.on_time_orders, 1)
+        self.assertEqual(self.vendor.fulfillment_rate, Decimal('50.00'))
+        self.assertEqual(self.vendor.on_time_delivery_rate, Decimal('100.00'))
+        self.assertEqual(self.vendor.quality_rating_avg, Decimal('8.00'))
+        self.assertEqual(self.vendor.average_response_time, Decimal('4.00'))
+
+        second.delete()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.total_orders, 1)
+        self.assertEqual(self.vendor.fulfillment_rate, Decimal('100.00'))
+
+    def test_save_query_count_does_not_grow_with_history(self):
+        for _ in range(5):
+            self.create_order()
+        order = PurchaseOrder.objects.using(self.shard).filter(vendor=self.vendor).first()
+        order.acknowledgment_date = datetime.now()
+        # Acknowledging sets the average response time, so one history snapshot is written,
+        # the PO's day in VendorDailyStats is updated and its response-time bucket is created
+        # (a missed update, an insert and the update again)
+        with self.assertNumQueries(13, using=self.shard):
+            order.save()
+
+    def test_history_written_only_when_metrics_change(self):
+        first = self.create_order()
+        self.create_order()
+        self.assertEqual(list(HistorialPerformance.objects.using(self.shard).values_list('fulfillment_rate', flat=True)), [Decimal('0.00')])
+
+        first.quantity = 7
+        first.save()
+        first.items = {"Pen": 7}
+        first.save()
+        self.assertEqual(HistorialPerformance.objects.using(self.shard).count(), 1)
+
+        first.acknowledgment_date = first.issue_date + timedelta(hours=4)
+        first.status = 'Completed'
+        first.quality_rating = 8
+        first.save()
+        latest = HistorialPerformance.objects.using(self.shard).latest('id')
+        self.assertEqual(HistorialPerformance.objects.using(self.shard).count(), 2)
+        self.assertEqual((latest.fulfillment_rate, latest.quality_rating_avg, latest.bucket, latest.samples),
+                         (Decimal('50.00'), Decimal('8.00'), 'raw', 1))
+
+
+@override_settings(VENDOR_METRICS_MODE='deferred')
+class DeferredScorecardTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        self.shard = self.vendor._state.db
+
+    def test_saves_are_coalesced_until_flush(self):
+        for _ in range(3):
+            PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                         delivery_date=datetime.now() + timedelta(days=7), created_by=self.user)
+        self.assertEqual(DirtyVendor.objects.using(self.shard).count(), 1)
+        self.vendor.refresh_from_db()
+        self.assertIsNone(self.vendor.fulfillment_rate)
+
+        self.assertEqual(process_dirty_vendors(debounce=3600, using=self.shard), 0)
+        self.assertEqual(flush_dirty_vendors(), 1)
+        self.assertFalse(DirtyVendor.objects.using(self.shard).exists())
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.total_orders, 3)
+        self.assertEqual(self.vendor.fulfillment_rate, Decimal('0.00'))
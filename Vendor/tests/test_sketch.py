@@ -0,0 +1,120 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from ..models import *
+from ..scorecard import aggregate_response_time_buckets, rebuild_scorecards, response_time_sketch
+from ..sharding import scatter
+from ..sketch import ZERO_KEY, key_value, merge, percentiles, quantile, sketch_key
+
+
+class SketchTests(TestCase):
+    databases = '__all__'
+
+    def sketch(self, values):
+        return dict(Counter(sketch_key(value) for value in values))
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [round(rng.lognormvariate(2, 1.5), 2) for _ in range(5000)]
+        sketch = self.sketch(values)
+        ordered = sorted(values)
+        for fraction in (0.5, 0.9, 0.99):
+            exact = ordered[int(fraction * (len(values) - 1))]
+            self.assertLessEqual(abs(quantile(sketch, fraction) - exact), 0.01 * exact)
+        self.assertLess(len(sketch), 1000)
+
+    def test_merge_equals_sketch_of_all_values(self):
+        first, second = [0, 1.5, 3, 3, 40], [2.25, 3, 700]
+        self.assertEqual(merge(self.sketch(first), self.sketch(second)), self.sketch(first + second))
+        self.assertEqual(merge({1: 2}, {1: -2}), {})
+
+    def test_zero_bucket_and_empty_sketch(self):
+        self.assertEqual(sketch_key(Decimal('0.00')), ZERO_KEY)
+        self.assertEqual(key_value(ZERO_KEY), 0.0)
+        self.assertEqual(percentiles({}), {'p50': None, 'p90': None, 'p99': None})
+
+
+class ResponseTimeBucketTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = self.create_vendor("Mahindra", "MAHI07", 9876423457)
+        self.shard = self.vendor._state.db
+
+    def create_vendor(self, name, code, contact):
+        return Vendor.objects.create(name=name, contact_details=contact, address="Mumbai, India",
+                                     vendor_code=code, created_by=self.user)
+
+    def acknowledged_order(self, hours, vendor=None):
+        order = PurchaseOrder.objects.create(vendor=vendor or self.vendor, items={"Pen": 6}, quantity=5,
+                                             delivery_date=datetime.now() + timedelta(days=7), created_by=self.user)
+        order.acknowledgment_date = order.issue_date + timedelta(hours=hours)
+        order.save()
+        return order
+
+    def stored_buckets(self):
+        return {(row.vendor_id, row.key): {'count': row.count} for row in ResponseTimeBucket.objects.using(self.shard).filter(count__gt=0)}
+
+    def test_buckets_follow_order_changes(self):
+        self.acknowledged_order(2)
+        self.acknowledged_order(2)
+        moved = self.acknowledged_order(30)
+        moved.acknowledgment_date = moved.issue_date + timedelta(hours=5)
+        moved.save()
+        self.acknowledged_order(8).delete()
+
+        self.assertEqual(response_time_sketch(self.vendor.pk, self.shard), {sketch_key(2): 2, sketch_key(5): 1})
+        self.assertEqual(self.stored_buckets(), aggregate_response_time_buckets([self.vendor.pk], self.shard))
+
+        ResponseTimeBucket.objects.using(self.shard).delete()
+        ResponseTimeBucket.objects.using(self.shard).create(vendor=self.vendor, key=sketch_key(100), count=3)
+        rebuild_scorecards([self.vendor.pk], self.shard)
+        self.assertEqual(self.stored_buckets(), aggregate_response_time_buckets([self.vendor.pk], self.shard))
+        self.assertEqual(percentiles(response_time_sketch(self.vendor.pk, self.shard))['p50'],
+                         Decimal(key_value(sketch_key(2))).quantize(Decimal('0.01')))
+
+    def test_deleting_vendor_leaves_no_buckets(self):
+        self.acknowledged_order(3)
+        self.vendor.delete()
+        self.assertFalse(any(rows.exists() for rows in scatter(ResponseTimeBucket.objects.all())))
+
+        other = self.create_vendor("Tata", "TATA01", 9876423458)
+        self.acknowledged_order(3, other)
+        Vendor.objects.using(other._state.db).filter(pk=other.pk).delete()
+        self.assertFalse(any(rows.exists() for rows in scatter(ResponseTimeBucket.objects.all())))
+
+    def test_decrement_never_creates_a_bucket(self):
+        order = self.acknowledged_order(3)
+        ResponseTimeBucket.objects.using(self.shard).delete()
+        order.delete()
+        self.assertFalse(ResponseTimeBucket.objects.using(self.shard).exists())
+
+    def test_vendor_and_org_percentile_endpoints(self):
+        other = self.create_vendor("Tata", "TATA01", 9876423458)
+        for hours in (1, 1, 1, 4):
+            self.acknowledged_order(hours)
+        for hours in (50, 50):
+            self.acknowledged_order(hours, other)
+
+        response = self.client.get(reverse('VendorsPerformance', kwargs={'id': 'MAHI07'}))
+        data = response.json()['data']['response_time_percentiles']
+        self.assertAlmostEqual(float(data['p50']), 1, delta=0.02)
+        self.assertEqual(set(data), {'p50', 'p90', 'p99'})
+
+        response = self.client.get(reverse('VendorsPerformance', kwargs={'id': 'MAHI07'}), {'window': 30})
+        self.assertNotIn('response_time_percentiles', response.json()['data'])
+
+        response = self.client.get(reverse('ResponseTimePercentiles'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['orders'], 6)
+        data = response.json()['data']
+        self.assertAlmostEqual(float(data['p50']), 1, delta=0.02)
+        self.assertAlmostEqual(float(data['p90']), 50, delta=0.6)
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import django
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from VMS.slowqueries import call_site, fingerprint, full_scans, read_log
+from ..models import *
+
+
+class SlowQueryLogTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'slow.log')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fingerprint_groups_parameters(self):
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 21"),
+                         fingerprint("SELECT *  FROM t WHERE a = 'it''s' AND b IN (%s) LIMIT 1"))
+        self.assertEqual(full_scans(['SCAN Vendor_purchaseorder', 'SEARCH Vendor_vendor USING INDEX x (id=?)',
+                                     'SCAN t USING COVERING INDEX i']), ['Vendor_purchaseorder'])
+
+    def test_slow_queries_logged_with_plan_and_call_site(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG=self.log):
+            with CaptureQueriesContext(connection) as queries, self.assertLogs('vms.slowqueries', level='WARNING'):
+                list(PurchaseOrder.objects.filter(quantity__gt=3))
+                list(PurchaseOrder.objects.filter(quantity__gt=9))
+        self.assertEqual(len(queries), 2)
+
+        records = read_log(self.log)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['fingerprint'], records[1]['fingerprint'])
+        self.assertEqual(records[0]['params'], ['3'])
+        self.assertIn('Vendor/tests/test_slowqueries.py', records[0]['stack'][-1])
+        self.assertTrue(any(line.startswith('SCAN') for line in records[0]['plan']))
+
+        output = StringIO()
+        call_command('slow_queries', '--log', self.log, '--json', stdout=output)
+        offender = json.loads(output.getvalue())[0]
+        self.assertEqual(offender['count'], 2)
+        self.assertEqual(offender['full_scans'], ['Vendor_purchaseorder'])
+
+    def test_call_site_skips_libraries_under_base_dir(self):
+        # As with a venv inside the project: Django and the standard library sit under BASE_DIR too
+        root = os.path.commonpath([str(settings.BASE_DIR), django.__file__, os.__file__])
+        with override_settings(BASE_DIR=root):
+            # call_site() drops its own frame and the database wrapper's that calls it
+            frames = (lambda: call_site(limit=50))()
+        self.assertIn('Vendor/tests/test_slowqueries.py', frames[-1])
+        self.assertFalse([frame for frame in frames if 'site-packages' in frame or 'lib/python' in frame], frames)
+
+    def test_fast_queries_not_logged(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=10 ** 6, SLOW_QUERY_LOG=self.log):
+            list(PurchaseOrder.objects.all())
+        self.assertFalse(os.path.exists(self.log))
@@ -1,10 +1,16 @@
+import json
+from datetime import datetime, timedelta
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from ..models import *
+from ..caching import cache_stats
+from ..revocation import revocation_store
 
 class AuthenticationTests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.client = APIClient()
 
@@ -62,7 +68,60 @@ class AuthenticationTests(TestCase):
         self.assertFalse(response.data['status'])
         self.assertIn('Invalid Login Credential', response.data['message'])
 
+    def test_token_user_is_cached(self):
+        User.objects.create_user(username='shivamsharma', password='shivam1234')
+        response = self.client.post('/api/login', {'username': 'shivamsharma', 'password': 'shivam1234'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['data']['access']}")
+        url = '/api/cache_stats'
+
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Negative Testing - Deactivated user is evicted from the cache
+        User.objects.filter(username='shivamsharma').update(is_active=False)
+        user = User.objects.get(username='shivamsharma')
+        user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_rotation(self):
+        User.objects.create_user(username='shivamsharma', password='shivam1234')
+        response = self.client.post('/api/login', {'username': 'shivamsharma', 'password': 'shivam1234'}, format='json')
+        refresh = response.data['data']['refresh']
+
+        response = self.client.post('/api/token/refresh', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['status'])
+        self.assertIn('access', response.data['data'])
+        rotated = response.data['data']['refresh']
+        self.assertNotEqual(rotated, refresh)
+
+        # Negative Testing - Rotated token cannot be reused
+        with self.assertNumQueries(0):
+            response = self.client.post('/api/token/refresh', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(response.data['status'])
+
+        # Negative Testing - Logged out token cannot be refreshed
+        response = self.client.post('/api/logout', {'refresh': rotated}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/token/refresh', {'refresh': rotated}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post('/api/token/refresh', {'refresh': 'garbage'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_revocations_are_pruned(self):
+        RevokedToken.objects.create(jti='expired', expires_at=datetime.now() - timedelta(days=1))
+        revocation_store.sync(force=True)
+        self.assertFalse(revocation_store.is_revoked('expired'))
+        self.assertFalse(RevokedToken.objects.filter(jti='expired').exists())
+
 class VendorAPITests(TestCase):
+    databases = '__all__'
+
     fixtures = ['Vendor/tests/main.json']
     
     def setUp(self):
@@ -200,6 +259,8 @@ class VendorAPITests(TestCase):
     
 
 class PurchaseOrderAPITests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
@@ -273,7 +334,319 @@ class PurchaseOrderAPITests(TestCase):
         self.assertFalse(response.data['status'])
         self.assertIn('Something went wrong', response.data['message'])
 
+class VendorCacheTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+
+    def test_performance_is_cached_until_purchase_order_saved(self):
+        url = f'/api/vendors/{self.vendor.vendor_code}/performance'
+        self.client.get(url)
+        hits = cache_stats()['hits']
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIsNone(response.data['data']['fulfillment_rate'])
+        self.assertEqual(cache_stats()['hits'], hits + 2)
+
+        PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                     delivery_date="2024-04-02T17:43:59", created_by=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.data['data']['fulfillment_rate'], '0.00')
+
+    def test_vendor_detail_invalidated_on_update(self):
+        url = f'/api/vendors/{self.vendor.vendor_code}'
+        self.client.get(url)
+        self.client.put(url, {"address": "Pune, India"}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.data['data']['address'], 'Pune, India')
+
+
+class ConditionalGetTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        self.purchase_order = PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                                           delivery_date="2024-04-02T17:43:59", created_by=self.user)
+
+    def test_detail_not_modified(self):
+        url = f'/api/purchase_orders/{self.purchase_order.po_number}'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1, using=self.vendor._state.db):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.client.post(f'{url}/acknowledge')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        url = '/api/purchase_orders'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                     delivery_date="2024-04-02T17:43:59", created_by=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_pages_have_their_own_etag(self):
+        PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                     delivery_date="2024-04-02T17:43:59", created_by=self.user)
+        url = '/api/purchase_orders'
+        first = self.client.get(url, {'page_size': 1})
+        cursor = first.data['next']
+        second = self.client.get(f'{url}?page_size=1&cursor={cursor}')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+        response = self.client.get(url, {'cursor': cursor, 'page_size': 1}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, {'cursor': cursor, 'page_size': 1}, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_vendor_performance_not_modified(self):
+        url = f'/api/vendors/{self.vendor.vendor_code}/performance'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ChangesAPITests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+
+    def test_purchase_order_changes_and_tombstones(self):
+        watermark = datetime.now().isoformat()
+        orders = [PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                               delivery_date="2024-04-02T17:43:59", created_by=self.user)
+                  for _ in range(3)]
+        deleted_po_number = orders[0].po_number
+        orders[0].delete()
+
+        changes = []
+        params = {'updated_since': watermark, 'page_size': 2}
+        while True:
+            response = self.client.get('/api/changes/purchase_orders', params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            changes += response.data['data']['changes']
+            if not response.data['next']:
+                break
+            params['cursor'] = response.data['next']
+        self.assertEqual([(change['op'], change['key']) for change in changes],
+                         [('upsert', orders[1].po_number), ('upsert', orders[2].po_number),
+                          ('delete', deleted_po_number)])
+
+        params = {'updated_since': response.data['data']['watermark'].isoformat()}
+        response = self.client.get('/api/changes/purchase_orders', params)
+        self.assertEqual(response.data['data']['changes'], [])
+
+        # Negative Testing - Missing watermark and unknown resource
+        response = self.client.get('/api/changes/purchase_orders')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/changes/invoices', {'updated_since': watermark})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_vendor_tombstone(self):
+        watermark = datetime.now().isoformat()
+        self.client.delete(f'/api/vendors/{self.vendor.vendor_code}')
+        response = self.client.get('/api/changes/vendors', {'updated_since': watermark})
+        self.assertEqual(response.data['data']['changes'][-1]['op'], 'delete')
+        self.assertEqual(response.data['data']['changes'][-1]['key'], 'MAHI07')
+
+
+class PaginationTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        for _ in range(5):
+            PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                         delivery_date="2024-04-02T17:43:59", created_by=self.user)
+
+    def test_purchase_order_pages(self):
+        url = '/api/purchase_orders'
+        po_numbers = []
+        params = {'page_size': 2}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['data']), 2)
+            po_numbers += [row['po_number'] for row in response.data['data']]
+            if not response.data['next']:
+                break
+            params['cursor'] = response.data['next']
+        self.assertEqual(po_numbers, list(self.vendor.purchaseorder_set.order_by('order_date', 'po_number')
+                                          .values_list('po_number', flat=True)))
+
+        # Negative Testing - Tampered cursor
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['status'])
+
+    def test_vendor_pages(self):
+        Vendor.objects.create(name="Tata", contact_details=9876423458, address="Pune, India", vendor_code="TATA01")
+        response = self.client.get('/api/vendors', {'page_size': 1})
+        self.assertEqual([row['vendor_code'] for row in response.data['data']], ['MAHI07'])
+        response = self.client.get('/api/vendors', {'page_size': 1, 'cursor': response.data['next']})
+        self.assertEqual([row['vendor_code'] for row in response.data['data']], ['TATA01'])
+        self.assertIsNone(response.data['next'])
+
+
+class PurchaseOrderFilterTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        other = Vendor.objects.create(name="Tata", contact_details=9876423458, address="Pune, India",
+                                      vendor_code="TATA01", created_by=self.user)
+        self.early = PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                                  delivery_date="2024-04-02T17:43:59", created_by=self.user)
+        self.late = PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                                 delivery_date="2024-05-10T09:00:00", created_by=self.user)
+        PurchaseOrder.objects.create(vendor=other, items={"Pen": 6}, quantity=5,
+                                     delivery_date="2024-04-02T17:43:59", created_by=self.user)
+        self.client.post(f'/api/purchase_orders/{self.late.po_number}/acknowledge')
+
+    def get_po_numbers(self, **params):
+        response = self.client.get('/api/purchase_orders', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['po_number'] for row in response.data['data']]
+
+    def test_filter_purchase_orders(self):
+        self.assertEqual(len(self.get_po_numbers(vendor_code='MAHI07')), 2)
+        self.assertEqual(self.get_po_numbers(vendor_code='MAHI07', acknowledged='false'), [self.early.po_number])
+        self.assertEqual(self.get_po_numbers(vendor_code='MAHI07', acknowledged='true'), [self.late.po_number])
+        self.assertEqual(self.get_po_numbers(vendor_code='MAHI07', delivery_date_from='2024-05-01',
+                                             delivery_date_to='2024-05-10'), [self.late.po_number])
+        self.assertEqual(len(self.get_po_numbers(status='Pending')), 3)
+        self.assertEqual(self.get_po_numbers(status='Completed'), [])
+
+        # Negative Testing - Invalid values
+        for params in ({'status': 'Lost'}, {'acknowledged': 'maybe'}, {'order_date_from': 'yesterday'}):
+            response = self.client.get('/api/purchase_orders', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertFalse(response.data['status'])
+
+
+class PurchaseOrderExportAPITests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        for _ in range(3):
+            PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                         delivery_date="2024-04-02T17:43:59", created_by=self.user)
+
+    def test_export_purchase_orders(self):
+        url = '/api/purchase_orders/export'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['vendor_code'], 'MAHI07')
+        self.assertEqual(json.loads(lines[0])['items'], {"Pen": 6})
+
+        response = self.client.get(url, {'output': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(rows[0].startswith('po_number,vendor_code'))
+
+        # Negative Testing - Unknown format
+        response = self.client.get(url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['status'])
+
+
+class PurchaseOrderBulkAPITests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+
+    def test_bulk_create_purchase_orders(self):
+        url = '/api/purchase_orders/bulk'
+        order = {"vendor_name": "Mahindra", "items": {"Pen": 6}, "quantity": 7, "delivery_date": "2024-04-02T17:43:59"}
+
+        # Positive Testing
+        response = self.client.post(url, [order, order, order], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['status'])
+        self.assertEqual(response.data['message'], 'Purchase Orders Created Successfully')
+        self.assertEqual(len({row['po_number'] for row in response.data['data']}), 3)
+        self.assertEqual(self.vendor.purchaseorder_set.count(), 3)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.total_orders, 3)
+
+        # Negative Testing - Partial failure is reported per row
+        rows = [order, {**order, "vendor_name": "Unknown"}, {**order, "status": "Completed"}, {"vendor_name": "Mahindra"}]
+        response = self.client.post(url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertFalse(response.data['status'])
+        self.assertIn('po_number', response.data['data'][0])
+        self.assertEqual(response.data['data'][1]['errors'], 'Vendor not found')
+        self.assertEqual(response.data['data'][2]['errors'], 'Cannot add quality rating and status in creation')
+        self.assertIn('quantity', response.data['data'][3]['errors'])
+        self.assertEqual(self.vendor.purchaseorder_set.count(), 4)
+
+        # Negative Testing - A vendor name that is not a string only fails its own row
+        rows = [order, {**order, "vendor_name": ["Mahindra"]}, {**order, "vendor_name": {"name": "Mahindra"}}]
+        response = self.client.post(url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertIn('po_number', response.data['data'][0])
+        self.assertIn('vendor_name', response.data['data'][1]['errors'])
+        self.assertIn('vendor_name', response.data['data'][2]['errors'])
+        self.assertEqual(self.vendor.purchaseorder_set.count(), 5)
+
+        # Negative Testing - Not a list
+        response = self.client.post(url, order, format='json')
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+        self.assertFalse(response.data['status'])
+
+
 class PurchaseOrderDataAPITests(TestCase):
+    databases = '__all__'
+
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
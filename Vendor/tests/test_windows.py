@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.test import TestCase
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from ..models import *
+from ..scorecard import COUNTER_FIELDS, aggregate_daily_counters, rebuild_scorecards, window_metrics
+from ..sharding import scatter
+
+
+class WindowMetricsTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shivamsharma', password='shivam1234')
+        self.client.force_authenticate(user=self.user)
+        self.vendor = Vendor.objects.create(name="Mahindra", contact_details=9876423457, address="Mumbai, India",
+                                            vendor_code="MAHI07", created_by=self.user)
+        self.shard = self.vendor._state.db
+
+    def create_order(self, days_ago=0, **kwargs):
+        order = PurchaseOrder.objects.create(vendor=self.vendor, items={"Pen": 6}, quantity=5,
+                                             delivery_date=datetime.now() + timedelta(days=7),
+                                             created_by=self.user, **kwargs)
+        if days_ago:
+            # Backdate through the ORM so the signal keeps the day's row in step
+            moved = order.order_date - timedelta(days=days_ago)
+            PurchaseOrder.objects.using(self.shard).filter(pk=order.pk).update(order_date=moved, issue_date=moved)
+            order.refresh_from_db()
+            rebuild_scorecards([self.vendor.pk], self.shard)
+        return order
+
+    def complete(self, order, rating):
+        order.acknowledgment_date = order.issue_date + timedelta(hours=2)
+        order.save()
+        order.status, order.quality_rating = 'Completed', rating
+        order.save()
+
+    def daily_rows(self):
+        return {(row.vendor_id, row.date): {field: getattr(row, field) for field in COUNTER_FIELDS}
+                for row in VendorDailyStats.objects.using(self.shard)}
+
+    def test_daily_stats_follow_order_changes(self):
+        old = self.create_order(days_ago=60)
+        self.complete(old, 4)
+        recent = self.create_order()
+        self.complete(recent, 10)
+        self.create_order()
+        cancelled = self.create_order()
+        cancelled.delete()
+
+        self.assertEqual(self.daily_rows(), aggregate_daily_counters([self.vendor.pk], self.shard))
+        today = datetime.now().date()
+        self.assertEqual(VendorDailyStats.objects.using(self.shard).get(date=today).total_orders, 2)
+
+        last_30 = window_metrics(self.vendor.pk, 30, self.shard)
+        self.assertEqual(last_30, {'on_time_delivery_rate': Decimal('100.00'), 'quality_rating_avg': Decimal('10.00'),
+                                   'average_response_time': Decimal('2.00'), 'fulfillment_rate': Decimal('50.00')})
+        self.assertEqual(window_metrics(self.vendor.pk, 90, self.shard)['quality_rating_avg'], Decimal('7.00'))
+        self.assertEqual(window_metrics(self.vendor.pk, 30, self.shard, today=today + timedelta(days=60))['fulfillment_rate'], None)
+
+        with self.assertNumQueries(1, using=self.shard):
+            window_metrics(self.vendor.pk, 365, self.shard)
+
+    def test_rebuild_matches_incremental_rows(self):
+        for rating in (3, 7, 9):
+            self.complete(self.create_order(), rating)
+        incremental = self.daily_rows()
+        rebuild_scorecards([self.vendor.pk], self.shard)
+        self.assertEqual(self.daily_rows(), incremental)
+
+    def test_performance_api_window(self):
+        self.complete(self.create_order(days_ago=100), 2)
+        self.complete(self.create_order(), 8)
+        response = self.client.get('/api/vendors/MAHI07/performance', {'window': 90})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.data['window'], 90)
+        self.assertEqual(response.data['data']['quality_rating_avg'], '8.00')
+        response = self.client.get('/api/vendors/MAHI07/performance', {'window': 365})
+        self.assertEqual(response.data['data']['quality_rating_avg'], '5.00')
+        self.assertEqual(self.client.get('/api/vendors/MAHI07/performance', {'window': 7}).status_code, 400)
+        self.assertEqual(self.client.get('/api/vendors/MAHI07/performance').data['data']['quality_rating_avg'], '5.00')
+
+    def test_deleting_vendor_with_completed_orders(self):
+        for rating in (4, 9):
+            self.complete(self.create_order(), rating)
+        self.vendor.delete()
+        self.assertFalse(any(rows.exists() for rows in scatter(VendorDailyStats.objects.all())))
+
+        vendor = Vendor.objects.create(name="Tata", contact_details=9876423458, address="Pune, India",
+                                       vendor_code="TATA01", created_by=self.user)
+        self.vendor = vendor
+        self.complete(self.create_order(), 6)
+        response = self.client.delete('/api/vendors/TATA01')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(rows.exists() for rows in scatter(Vendor.objects.all())))
+        self.assertFalse(any(rows.exists() for rows in scatter(VendorDailyStats.objects.all())))
+
+    def test_decrement_never_creates_a_row(self):
+        order = self.create_order()
+        VendorDailyStats.objects.using(self.shard).delete()
+        order.delete()
+        self.assertFalse(VendorDailyStats.objects.using(self.shard).exists())
@@ -6,10 +6,18 @@ from . import views
 urlpatterns = [
     path('signup', views.Signup.as_view(), name='signup'),
     path('login', views.Login.as_view(), name='login'),
+    path('token/refresh', views.TokenRefresh.as_view(), name='TokenRefresh'),
+    path('logout', views.Logout.as_view(), name='logout'),
     path('vendors', views.VendorAPI.as_view(), name='Vendors'),
     path('vendors/<str:id>', views.VendorDataAPI.as_view(), name='VendorsData'),
     path('vendors/<str:id>/performance', views.PerformanceAPI.as_view(), name='VendorsPerformance'),
+    path('vendors/<str:id>/performance/history', views.PerformanceHistoryAPI.as_view(), name='VendorsPerformanceHistory'),
+    path('performance/response_time', views.ResponseTimePercentilesAPI.as_view(), name='ResponseTimePercentiles'),
     path('purchase_orders', views.PurchaseOrderAPI.as_view(), name='PurchaseOrders'),
+    path('purchase_orders/bulk', views.PurchaseOrderBulkAPI.as_view(), name='PurchaseOrdersBulk'),
+    path('purchase_orders/export', views.PurchaseOrderExportAPI.as_view(), name='PurchaseOrdersExport'),
     path('purchase_orders/<str:id>', views.PurchaseOrderDataAPI.as_view(), name='PurchaseOrdersData'),
     path('purchase_orders/<str:id>/acknowledge', views.OrderAcknowledge.as_view(), name='PurchaseOrderAcknowledged'),
+    path('changes/<str:resource>', views.ChangesAPI.as_view(), name='Changes'),
+    path('cache_stats', views.CacheStatsAPI.as_view(), name='CacheStats'),
 ]
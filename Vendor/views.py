@@ -5,15 +5,30 @@ from rest_framework import status
 from .serializers import *
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
-from datetime import datetime, timezone
+from rest_framework_simplejwt.exceptions import InvalidToken
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from .permissions import IsOwnerOrReadOnly
-
-
-def responsedata(status, message, data=None):
+from .scorecard import add_orders_to_scorecards, window_metrics, org_response_time_sketch
+from .sketch import percentiles
+from .pagination import keyset_page
+from .export import export_purchase_orders
+from .filters import filter_purchase_orders, parse_boundary
+from .history import performance_history, performance_as_of
+from .caching import get_or_build, vendor_key, cache_stats
+from .sync import change_feed
+from .conditional import row_validators, list_validators, add_validators, not_modified
+from .sharding import on_vendor_shard, on_order_shard, scatter, scatter_get, shard_for_vendor_code, using_shard
+
+
+def responsedata(status, message, data=None, **extra):
     if status:
-        return {"status":status,"message":message,"data":data}
+        return {"status":status,"message":message,"data":data, **extra}
     else:
-        return {"status":status,"message":message,"data":data}
+        return {"status":status,"message":message,"data":data, **extra}
 
 def get_tokens_for_user(user):
   refresh = RefreshToken.for_user(user)
@@ -62,6 +77,37 @@ class Login(APIView):
             return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
 
 
+class TokenRefresh(APIView):
+    def post(self, request):
+        try:
+            serializer = TokenRefreshSerializer(data=request.data)
+            if serializer.is_valid():
+                return Response(responsedata(True, "Token Refreshed", serializer.validated_data),
+                                status=status.HTTP_200_OK)
+            return Response(responsedata(False, "Refresh token is required", serializer.errors),
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        except InvalidToken as err:
+            return Response(responsedata(False, "Invalid Refresh Token", err.detail), status=status.HTTP_401_UNAUTHORIZED)
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
+class Logout(APIView):
+    def post(self, request):
+        try:
+            serializer = LogoutSerializer(data=request.data)
+            if serializer.is_valid():
+                return Response(responsedata(True, "User Successfully Logged Out"), status=status.HTTP_200_OK)
+            return Response(responsedata(False, "Refresh token is required", serializer.errors),
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        except InvalidToken as err:
+            return Response(responsedata(False, "Invalid Refresh Token", err.detail), status=status.HTTP_401_UNAUTHORIZED)
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
 class VendorAPI(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -83,9 +129,15 @@ class VendorAPI(APIView):
 
     def get(self, request):
         try:
-            vendors = Vendor.objects.all()
+            validators = list_validators(Vendor.objects.all(), request.query_params)
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            vendors, next_cursor = keyset_page(Vendor.objects.all(), request, ['id', 'vendor_code'])
             serializer = VendorSerializer(vendors, many=True)
-            return Response(responsedata(True, "Data", serializer.data), status=status.HTTP_200_OK)
+            return add_validators(Response(responsedata(True, "Data", serializer.data, next=next_cursor),
+                                           status=status.HTTP_200_OK), validators)
         
         except Exception as err:
             return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
@@ -96,9 +148,15 @@ class VendorDataAPI(APIView):
 
     def get(self, request, id=None):
         try:
-            vendor = Vendor.objects.get(vendor_code=id)
-            serializer = VendorSerializer(vendor)
-            return Response(responsedata(True, "Data", serializer.data), status=status.HTTP_302_FOUND)
+            validators = get_or_build(vendor_key(id, 'validators'),
+                                      lambda: row_validators(on_vendor_shard(Vendor.objects.filter(vendor_code=id), id)))
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            data = get_or_build(vendor_key(id, 'detail'),
+                                lambda: VendorSerializer(on_vendor_shard(Vendor.objects.all(), id).get(vendor_code=id)).data)
+            return add_validators(Response(responsedata(True, "Data", data), status=status.HTTP_302_FOUND), validators)
         
         except Exception as err:
             return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
@@ -111,7 +169,7 @@ class VendorDataAPI(APIView):
             if request.data.get('created_by'):
                 return Response(responsedata(False, "Should not change owner of purchase order"), status=status.HTTP_406_NOT_ACCEPTABLE)
             
-            vendor = Vendor.objects.get(vendor_code=id)
+            vendor = on_vendor_shard(Vendor.objects.all(), id).get(vendor_code=id)
             self.check_object_permissions(request, vendor)
             serializer = VendorSerializer(vendor, data=request.data, partial=True)
             if serializer.is_valid():
@@ -127,7 +185,7 @@ class VendorDataAPI(APIView):
 
     def delete(self, request, id=None):
         try:
-            vendor = Vendor.objects.get(vendor_code=id)
+            vendor = on_vendor_shard(Vendor.objects.all(), id).get(vendor_code=id)
             self.check_object_permissions(request, vendor)
             vendor.delete()
             return Response(responsedata(True, "Deleted"), status=status.HTTP_200_OK)
@@ -152,10 +210,10 @@ class PurchaseOrderAPI(APIView):
                 return Response(responsedata(False, "Cannot add quality rating and status in creation"),
                                 status=status.HTTP_406_NOT_ACCEPTABLE)
 
-            vendor = Vendor.objects.get(name=vendor_name)
+            vendor = scatter_get(Vendor.objects.filter(name=vendor_name))
             data['vendor'] = vendor.id
             data['created_by'] = request.user.id
-            serializer = PurchaseOrderSerializer(data=data)
+            serializer = PurchaseOrderSerializer(data=data, context={'shard': vendor._state.db})
             if serializer.is_valid():
                 serializer.save()
                 return Response(responsedata(True, "Purchase Order Created Successfully",serializer.data),
@@ -169,22 +227,120 @@ class PurchaseOrderAPI(APIView):
 
     def get(self, request):
         try:
-            purchaseorder = PurchaseOrder.objects.all()
+            purchaseorder = filter_purchase_orders(PurchaseOrder.objects.all(), request.query_params)
+            validators = list_validators(purchaseorder, request.query_params)
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            purchaseorder, next_cursor = keyset_page(purchaseorder, request, ['order_date', 'po_number'])
             serializer = PurchaseOrderSerializer(purchaseorder, many=True)
-            return Response(responsedata(True, "Data", serializer.data), status=status.HTTP_200_OK)
+            return add_validators(Response(responsedata(True, "Data", serializer.data, next=next_cursor),
+                                           status=status.HTTP_200_OK), validators)
         
         except Exception as err:
             return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
 
 
+class PurchaseOrderBulkAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            rows = request.data
+            if not isinstance(rows, list) or not rows:
+                return Response(responsedata(False, "Expected a list of purchase orders"),
+                                status=status.HTTP_406_NOT_ACCEPTABLE)
+
+            # Other types are left to PurchaseOrderBulkSerializer to report on their row
+            vendor_names = {row.get('vendor_name') for row in rows
+                            if isinstance(row, dict) and isinstance(row.get('vendor_name'), str)}
+            vendors = {vendor.name: vendor for part in scatter(Vendor.objects.filter(name__in=vendor_names))
+                       for vendor in part}
+            results = [None] * len(rows)
+            orders_by_vendor = defaultdict(list)
+            for index, row in enumerate(rows):
+                if not isinstance(row, dict):
+                    results[index] = {"index": index, "errors": "Purchase order should be an object"}
+                    continue
+                if row.get('quality_rating') or row.get('status'):
+                    results[index] = {"index": index, "errors": "Cannot add quality rating and status in creation"}
+                    continue
+
+                serializer = PurchaseOrderBulkSerializer(data=row)
+                if not serializer.is_valid():
+                    results[index] = {"index": index, "errors": serializer.errors}
+                    continue
+
+                data = serializer.validated_data
+                vendor = vendors.get(data.pop('vendor_name'))
+                if vendor is None:
+                    results[index] = {"index": index, "errors": "Vendor not found"}
+                    continue
+                order = PurchaseOrder(vendor=vendor, created_by=request.user, **data)
+                orders_by_vendor[vendor.name].append((index, order))
+
+            orders_by_shard = defaultdict(list)
+            for vendor_name, entries in orders_by_vendor.items():
+                # Keyed by name: vendors on different shards can share a primary key
+                vendor = vendors[vendor_name]
+                PurchaseOrder.assign_po_numbers(vendor, [order for index, order in entries])
+                for index, order in entries:
+                    order.compute_derived_fields()
+                    orders_by_shard[shard_for_vendor_code(vendor.vendor_code)].append(order)
+                    results[index] = {"index": index, "po_number": order.po_number}
+
+            orders = []
+            for shard, shard_orders in orders_by_shard.items():
+                with transaction.atomic(using=shard):
+                    using_shard(PurchaseOrder.objects.all(), shard).bulk_create(shard_orders, batch_size=500)
+                    add_orders_to_scorecards(shard_orders)
+                orders.extend(shard_orders)
+
+            if len(orders) == len(rows):
+                return Response(responsedata(True, "Purchase Orders Created Successfully", results),
+                                status=status.HTTP_201_CREATED)
+            if orders:
+                return Response(responsedata(False, "Some purchase orders could not be created", results),
+                                status=status.HTTP_207_MULTI_STATUS)
+            return Response(responsedata(False, "No purchase order created", results),
+                            status=status.HTTP_406_NOT_ACCEPTABLE)
+
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
+class PurchaseOrderExportAPI(APIView):
+    permission_classes = [IsAuthenticated]
+    content_types = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    def get(self, request):
+        try:
+            output_format = request.query_params.get('output', 'ndjson')
+            lines = export_purchase_orders(output_format)
+            response = StreamingHttpResponse(lines, content_type=self.content_types[output_format])
+            response['Content-Disposition'] = f'attachment; filename="purchase_orders.{output_format}"'
+            return response
+
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
 class PurchaseOrderDataAPI(APIView):
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
 
     def get(self, request, id=None):
         try:
-            purchaseorder = PurchaseOrder.objects.get(po_number=id)
+            purchaseorders = on_order_shard(PurchaseOrder.objects.filter(po_number=id), id)
+            validators = row_validators(purchaseorders)
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            purchaseorder = purchaseorders.get()
             serializer = PurchaseOrderSerializer(purchaseorder)
-            return Response(responsedata(True, "Data", serializer.data), status=status.HTTP_302_FOUND)
+            return add_validators(Response(responsedata(True, "Data", serializer.data), status=status.HTTP_302_FOUND),
+                                  validators)
         
         except Exception as err:
             return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
@@ -195,7 +351,7 @@ class PurchaseOrderDataAPI(APIView):
             if not request.data:
                 return Response(responsedata(False, "Data not Found"), status=status.HTTP_204_NO_CONTENT)
             
-            purchaseorder = PurchaseOrder.objects.get(po_number=id)
+            purchaseorder = on_order_shard(PurchaseOrder.objects.all(), id).get(po_number=id)
             if purchaseorder.status != 'Pending':
                 return Response(responsedata(False, "Can not modify purchase order once completed or cancelled", {"Order Status":purchaseorder.status}),
                                 status=status.HTTP_304_NOT_MODIFIED)
@@ -219,7 +375,8 @@ class PurchaseOrderDataAPI(APIView):
                                     status=status.HTTP_406_NOT_ACCEPTABLE)
             
             self.check_object_permissions(request, purchaseorder)
-            serializer = PurchaseOrderSerializer(purchaseorder, data=request.data, partial=True)
+            serializer = PurchaseOrderSerializer(purchaseorder, data=request.data, partial=True,
+                                                 context={'shard': purchaseorder._state.db})
             if serializer.is_valid():
                 serializer.save()
                 return Response(responsedata(True, "Data updated", serializer.data), status=status.HTTP_201_CREATED)
@@ -233,7 +390,7 @@ class PurchaseOrderDataAPI(APIView):
 
     def delete(self, request, id=None):
         try:
-            purchaseorder = PurchaseOrder.objects.get(po_number=id)
+            purchaseorder = on_order_shard(PurchaseOrder.objects.all(), id).get(po_number=id)
             self.check_object_permissions(request, purchaseorder)
             purchaseorder.delete()
             return Response(responsedata(True, "Deleted"), status=status.HTTP_200_OK)
@@ -247,20 +404,101 @@ class PerformanceAPI(APIView):
 
     def get(self, request, id=None):
         try:
-            vendor = Vendor.objects.get(vendor_code=id)
-            serializer = PerformanceSerializer(vendor)
-            return Response(responsedata(True, "Data", serializer.data), status=status.HTTP_302_FOUND)
+            if request.query_params.get('window'):
+                return self.get_window(request.query_params['window'], id)
+
+            validators = get_or_build(vendor_key(id, 'validators'),
+                                      lambda: row_validators(on_vendor_shard(Vendor.objects.filter(vendor_code=id), id)))
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            data = get_or_build(vendor_key(id, 'performance'),
+                                lambda: PerformanceSerializer(on_vendor_shard(Vendor.objects.all(), id).get(vendor_code=id)).data)
+            return add_validators(Response(responsedata(True, "Data", data), status=status.HTTP_302_FOUND), validators)
         
         except Exception as err:
             return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
 
+    def get_window(self, window, id):
+        """ Metrics of the POs ordered in the last `window` days, from the vendor's daily stats """
+        windows = getattr(settings, 'PERFORMANCE_WINDOWS', [30, 90, 365])
+        if not window.isdigit() or int(window) not in windows:
+            raise ValueError(f'window should be one of {", ".join(map(str, windows))} days')
+        vendor = on_vendor_shard(Vendor.objects.only('pk'), id).get(vendor_code=id)
+        metrics = window_metrics(vendor.pk, int(window), vendor._state.db)
+        data = PerformanceSerializer(Vendor(**metrics)).data
+        # The response-time sketch covers every PO, so it has no per-window answer
+        data.pop('response_time_percentiles')
+        return Response(responsedata(True, "Data", data, window=int(window)), status=status.HTTP_302_FOUND)
+
+
+class PerformanceHistoryAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id=None):
+        """ ?as_of= for the metrics at one moment, or ?from=&to=&bucket= for a downsampled series """
+        try:
+            vendor = on_vendor_shard(Vendor.objects.only('pk'), id).get(vendor_code=id)
+            rows = on_vendor_shard(HistorialPerformance.objects.filter(vendor=vendor), id)
+            params = request.query_params
+            if params.get('as_of'):
+                moment, exclusive = parse_boundary('as_of', params['as_of'], end=True)
+                if exclusive:
+                    rows = rows.filter(created_at__lt=moment)
+                return Response(responsedata(True, "Data", performance_as_of(rows, moment)), status=status.HTTP_200_OK)
+
+            end, exclusive = parse_boundary('to', params['to'], end=True) if params.get('to') else (datetime.now(), False)
+            start = parse_boundary('from', params['from'])[0] if params.get('from') else end - timedelta(days=30)
+            if start >= end:
+                raise ValueError('from should be before to')
+            rows = rows.filter(created_at__gte=start, **{'created_at__lt' if exclusive else 'created_at__lte': end})
+            bucket, points = performance_history(rows, start, end, params.get('bucket'))
+            return Response(responsedata(True, "Data", points, bucket=bucket), status=status.HTTP_200_OK)
+
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResponseTimePercentilesAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """ Org-wide p50/p90/p99 response time, from every vendor's sketch merged """
+        try:
+            sketch = org_response_time_sketch()
+            return Response(responsedata(True, "Data", percentiles(sketch), orders=sum(sketch.values())),
+                            status=status.HTTP_200_OK)
+
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
+class ChangesAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, resource=None):
+        try:
+            data, next_cursor = change_feed(request, resource)
+            return Response(responsedata(True, "Data", data, next=next_cursor), status=status.HTTP_200_OK)
+
+        except Exception as err:
+            return Response(responsedata(False, "Something went wrong", str(err)), status=status.HTTP_400_BAD_REQUEST)
+
+
+class CacheStatsAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(responsedata(True, "Data", cache_stats()), status=status.HTTP_200_OK)
+
 
 class OrderAcknowledge(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, id=None):
         try:
-            purchaseorder = PurchaseOrder.objects.get(po_number=id)
+            purchaseorder = on_order_shard(PurchaseOrder.objects.all(), id).get(po_number=id)
             if purchaseorder.acknowledgment_date:
                 return Response(responsedata(False, "Purchase order already acknowledged"),
                                 status=status.HTTP_208_ALREADY_REPORTED)